@@ -3,12 +3,23 @@ Bluetooth device discovery and management for ELM327 adapters.
 Uses pyserial for cross-platform compatibility.
 """
 
+import re
+import time
+from collections import defaultdict
 import serial
 import serial.tools.list_ports
 from typing import List, Dict, Optional
 from .exceptions import DeviceNotFoundError
 
 
+# Common ELM327 identifiers in device description
+_ELM_KEYWORDS = ('elm327', 'obd', 'obdii', 'obd-ii', 'bluetooth', 'hc-05', 'hc-06')
+
+# Single alternation so each description is scanned once instead of per keyword;
+# matched against the lowercased description cached by scan_devices
+_ELM_PATTERN = re.compile('|'.join(map(re.escape, _ELM_KEYWORDS)))
+
+
 class BluetoothManager:
     """Manages Bluetooth device discovery and enumeration."""
 
@@ -16,13 +27,35 @@ class BluetoothManager:
         """Initialize Bluetooth manager."""
         self.devices = []
 
-    def scan_devices(self) -> List[Dict[str, str]]:
+        # Enumeration walks the OS device tree, so results are reused
+        # for a short time instead of rescanning on every query
+        self._cache_ts = 0.0
+        self._cache_ttl = 5.0
+
+        # Port name -> outgoing (True) / incoming (False), built from the last scan
+        self._port_direction: Optional[Dict[str, bool]] = None
+
+        # Filtered ELM327 list, valid while self.devices is the same scan result
+        self._elm_source: Optional[List[Dict[str, str]]] = None
+        self._elm_devices: List[Dict[str, str]] = []
+
+    def scan_devices(self, force: bool = False) -> List[Dict[str, str]]:
         """
         Scan for available serial/Bluetooth devices.
 
+        Results are cached for a few seconds; repeated calls within that
+        window return the previous scan.
+
+        Args:
+            force: Bypass the cache and always enumerate ports
+
         Returns:
             List of device dictionaries with 'port', 'description', and 'hwid' keys.
         """
+        if (not force and self.devices
+                and time.monotonic() - self._cache_ts < self._cache_ttl):
+            return self.devices
+
         self.devices = []
         ports = serial.tools.list_ports.comports()
 
@@ -32,12 +65,19 @@ class BluetoothManager:
                 'description': port.description,
                 'hwid': port.hwid,
                 'manufacturer': port.manufacturer or 'Unknown',
-                'product': port.product or 'Unknown'
+                'product': port.product or 'Unknown',
+                '_desc_lower': (port.description or '').lower()
             }
             self.devices.append(device_info)
 
+        self._cache_ts = time.monotonic()
+        self._port_direction = None
         return self.devices
 
+    def invalidate_cache(self):
+        """Force the next scan to enumerate ports again (e.g. after plug/unplug)."""
+        self._cache_ts = 0.0
+
     def get_elm327_devices(self) -> List[Dict[str, str]]:
         """
         Filter devices to find likely ELM327 adapters.
@@ -45,22 +85,24 @@ class BluetoothManager:
         Returns:
             List of devices that may be ELM327 adapters.
         """
-        if not self.devices:
-            self.scan_devices()
+        devices = self.scan_devices()
 
-        # Common ELM327 identifiers in device description
-        elm_keywords = ['elm327', 'obd', 'obdii', 'obd-ii', 'bluetooth', 'hc-05', 'hc-06']
+        # A single port is returned either way, so skip the filter
+        if len(devices) <= 1:
+            return devices
 
-        filtered_devices = []
-        for device in self.devices:
-            desc_lower = device['description'].lower()
-            if any(keyword in desc_lower for keyword in elm_keywords):
-                filtered_devices.append(device)
+        # Rescans build a new list, so identity tells us the filter is still valid
+        if devices is self._elm_source:
+            return self._elm_devices
+
+        filtered_devices = [d for d in devices if _ELM_PATTERN.search(d['_desc_lower'])]
 
         # If no matches, return all devices (user may need to manually select)
         if not filtered_devices:
-            return self.devices
+            filtered_devices = devices
 
+        self._elm_source = devices
+        self._elm_devices = filtered_devices
         return filtered_devices
 
     def find_device_by_port(self, port_name: str) -> Optional[Dict[str, str]]:
@@ -73,8 +115,7 @@ class BluetoothManager:
         Returns:
             Device info dictionary or None if not found.
         """
-        if not self.devices:
-            self.scan_devices()
+        self.scan_devices()
 
         for device in self.devices:
             if device['port'] == port_name:
@@ -89,28 +130,17 @@ class BluetoothManager:
         Returns:
             List of tuples: [(outgoing_port, incoming_port), ...]
         """
-        if not self.devices:
-            self.scan_devices()
+        self.scan_devices()
 
         # Group Bluetooth ports by description
-        bluetooth_ports = {}
+        bluetooth_ports = defaultdict(list)
         for device in self.devices:
-            desc = device['description'].lower()
+            desc = device['_desc_lower']
             if 'bluetooth' in desc or 'bth' in desc:
-                base_desc = device['description']
-                if base_desc not in bluetooth_ports:
-                    bluetooth_ports[base_desc] = []
-                bluetooth_ports[base_desc].append(device['port'])
+                bluetooth_ports[device['description']].append(device['port'])
 
-        # Find pairs (usually sequential COM ports)
-        pairs = []
-        for ports in bluetooth_ports.values():
-            if len(ports) == 2:
-                # Lower number is typically outgoing
-                ports.sort()
-                pairs.append((ports[0], ports[1]))
-
-        return pairs
+        # Find pairs (usually sequential COM ports); lower number is typically outgoing
+        return [tuple(sorted(ports)) for ports in bluetooth_ports.values() if len(ports) == 2]
 
     def is_likely_outgoing_port(self, port_name: str) -> Optional[bool]:
         """
@@ -122,12 +152,13 @@ class BluetoothManager:
         Returns:
             True if likely outgoing, False if likely incoming, None if unknown
         """
-        pairs = self.get_bluetooth_port_pairs()
+        self.scan_devices()
 
-        for outgoing, incoming in pairs:
-            if port_name == outgoing:
-                return True
-            elif port_name == incoming:
-                return False
+        if self._port_direction is None:
+            direction = {}
+            for outgoing, incoming in self.get_bluetooth_port_pairs():
+                direction[outgoing] = True
+                direction[incoming] = False
+            self._port_direction = direction
 
-        return None
+        return self._port_direction.get(port_name)
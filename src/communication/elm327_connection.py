@@ -5,10 +5,23 @@ ELM327 connection management with automatic reconnection and error handling.
 import serial
 import time
 import threading
-from typing import Optional, Callable
+from contextlib import nullcontext
+from typing import List, Optional, Callable
 from communication.exceptions import ConnectionError, TimeoutError, InvalidResponseError
 
 
+# AT commands that reset the adapter or change its protocol, dropping any
+# settings the protocol handlers have cached (spaces removed, upper case)
+_STATE_RESET_COMMANDS = frozenset(('ATZ', 'ATD', 'ATWS'))
+_STATE_RESET_PREFIXES = ('ATSP', 'ATTP', 'ATFI')
+
+
+def _resets_state(command: str) -> bool:
+    """Check whether an AT command resets the adapter or its protocol."""
+    cmd = command.replace(' ', '').upper()
+    return cmd in _STATE_RESET_COMMANDS or cmd.startswith(_STATE_RESET_PREFIXES)
+
+
 class ELM327Connection:
     """Manages serial connection to ELM327 adapter."""
 
@@ -21,7 +34,15 @@ class ELM327Connection:
     BUS_INIT = 'BUS INIT'
     SEARCHING = 'SEARCHING'
 
-    def __init__(self, port: str, baudrate: int = 38400, timeout: float = 3.0):
+    # Frequently sent setup commands, encoded with terminator once
+    _PREENCODED = {
+        cmd: cmd.encode('ascii') + b'\r'
+        for cmd in ('ATZ', 'ATI', 'ATE0', 'ATE1', 'ATL0', 'ATH0', 'ATH1',
+                    'ATS0', 'ATS1', 'ATSP0', 'ATRV', 'ATDP', 'ATDPN')
+    }
+
+    def __init__(self, port: str, baudrate: int = 38400, timeout: float = 3.0,
+                 thread_safe: bool = False):
         """
         Initialize ELM327 connection.
 
@@ -29,13 +50,24 @@ class ELM327Connection:
             port: Serial port name (e.g., 'COM3', '/dev/rfcomm0')
             baudrate: Connection speed (default 38400, may be 9600, 115200, etc.)
             timeout: Read timeout in seconds
+            thread_safe: Serialize port access with a lock (needed when
+                several threads send commands on the same connection)
         """
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
         self.serial: Optional[serial.Serial] = None
         self.connected = False
-        self.lock = threading.Lock()
+        self.lock = threading.Lock() if thread_safe else nullcontext()
+
+        # Responses are framed by the prompt, so the input buffer only needs
+        # flushing after an error may have left a partial response behind
+        self._needs_flush = False
+
+        # Bumped whenever a command (from any caller) resets the adapter or
+        # changes its protocol; handlers that cache adapter settings compare
+        # it with the value they last saw
+        self.state_generation = 0
 
         # Callbacks
         self.on_disconnect_callback: Optional[Callable] = None
@@ -65,7 +97,10 @@ class ELM327Connection:
                 # Flush buffers
                 self.serial.reset_input_buffer()
                 self.serial.reset_output_buffer()
+                self._needs_flush = False
 
+                # The adapter on the port may not be the one last talked to
+                self.state_generation += 1
                 self.connected = True
                 return True
 
@@ -81,8 +116,9 @@ class ELM327Connection:
 
     def is_connected(self) -> bool:
         """Check if connection is active."""
-        with self.lock:
-            return self.connected and self.serial is not None and self.serial.is_open
+        # Read-only check; attribute reads are atomic so the lock is not needed
+        serial_port = self.serial
+        return self.connected and serial_port is not None and serial_port.is_open
 
     def send_command(self, command: str, delay: float = 0.1) -> str:
         """
@@ -103,38 +139,135 @@ class ELM327Connection:
         if not self.is_connected():
             raise ConnectionError("Not connected to device")
 
+        cmd_bytes = self._encode_command(command)
+
+        # Only the port exchange is locked; the response is cleaned afterwards
+        with self.lock:
+            raw = self._exchange(cmd_bytes, delay)
+
+        return self._clean_response(raw)
+
+    def send_command_ok(self, command: str, delay: float = 0.1) -> bool:
+        """
+        Send a command and report whether the adapter acknowledged it.
+
+        Checks the raw bytes for OK without decoding or cleaning the
+        response, for AT setup commands whose only output is the status.
+
+        Args:
+            command: Command string (without terminator)
+            delay: Delay after sending command (seconds)
+
+        Returns:
+            True if the response contains OK.
+
+        Raises:
+            ConnectionError: If not connected.
+            TimeoutError: If response times out.
+        """
+        if not self.is_connected():
+            raise ConnectionError("Not connected to device")
+
+        cmd_bytes = self._encode_command(command)
+
+        with self.lock:
+            raw = self._exchange(cmd_bytes, delay)
+
+        return b'OK' in raw
+
+    def send_commands(self, commands: List[str], delay: float = 0.1) -> List[str]:
+        """
+        Send several commands back to back in one locked transaction.
+
+        The ELM327 aborts a command when more input arrives before its prompt,
+        so each command still waits for its own response; batching saves the
+        per-command lock and flush handling and keeps other threads from
+        interleaving their commands between them.
+
+        Args:
+            commands: Command strings (without terminator)
+            delay: Delay after sending each command (seconds)
+
+        Returns:
+            Response strings, one per command.
+
+        Raises:
+            ConnectionError: If not connected.
+            TimeoutError: If a response times out.
+        """
+        if not self.is_connected():
+            raise ConnectionError("Not connected to device")
+
+        encoded = [self._encode_command(command) for command in commands]
+
         with self.lock:
-            try:
-                # Clear buffers
+            raws = [self._exchange(cmd_bytes, delay) for cmd_bytes in encoded]
+
+        return [self._clean_response(raw) for raw in raws]
+
+    def _exchange(self, cmd_bytes: bytes, delay: float) -> bytes:
+        """
+        Write one encoded command and read its raw response.
+
+        Must be called with the lock held.
+
+        Args:
+            cmd_bytes: Command bytes including terminator
+            delay: Delay after sending command (seconds)
+
+        Returns:
+            Raw response bytes ending with the prompt.
+        """
+        try:
+            # Discard leftovers from a failed exchange
+            if self._needs_flush:
                 self.serial.reset_input_buffer()
+                self._needs_flush = False
+
+            # Send command with carriage return
+            self.serial.write(cmd_bytes)
+
+            # Wait for adapter to process
+            time.sleep(delay)
+
+            # Read response
+            return self._read_raw()
 
-                # Send command with carriage return
-                cmd_bytes = (command + '\r').encode('ascii')
-                self.serial.write(cmd_bytes)
+        except TimeoutError:
+            self._needs_flush = True
+            raise
 
-                # Wait for adapter to process
-                time.sleep(delay)
+        except serial.SerialException as e:
+            self._needs_flush = True
+            self.connected = False
+            if self.on_disconnect_callback:
+                self.on_disconnect_callback()
+            raise ConnectionError(f"Communication error: {str(e)}")
 
-                # Read response
-                response = self._read_response()
+    def _encode_command(self, command: str) -> bytes:
+        """
+        Encode command with carriage return terminator.
 
-                return response
+        Every send path encodes through here, so this is also where commands
+        that reset the adapter bump state_generation.
+        """
+        if command[:2].upper() == 'AT' and _resets_state(command):
+            self.state_generation += 1
 
-            except serial.SerialException as e:
-                self.connected = False
-                if self.on_disconnect_callback:
-                    self.on_disconnect_callback()
-                raise ConnectionError(f"Communication error: {str(e)}")
+        cmd_bytes = self._PREENCODED.get(command)
+        if cmd_bytes is None:
+            cmd_bytes = command.encode('ascii') + b'\r'
+        return cmd_bytes
 
-    def _read_response(self, timeout: Optional[float] = None) -> str:
+    def _read_raw(self, timeout: Optional[float] = None) -> bytes:
         """
-        Read response from ELM327 until prompt character.
+        Read raw response from ELM327 until prompt character.
 
         Args:
             timeout: Override default timeout (seconds)
 
         Returns:
-            Response string without prompt.
+            Raw response bytes ending with the prompt.
 
         Raises:
             TimeoutError: If no response within timeout.
@@ -142,42 +275,34 @@ class ELM327Connection:
         if timeout is None:
             timeout = self.timeout
 
-        response_lines = []
-        start_time = time.time()
-
-        while True:
-            # Check timeout
-            if time.time() - start_time > timeout:
-                raise TimeoutError("Response timeout")
-
-            # Read available data
-            if self.serial.in_waiting > 0:
-                try:
-                    line = self.serial.readline().decode('ascii', errors='ignore').strip()
-
-                    if line:
-                        # Check for prompt (may be on same line or separate)
-                        if self.PROMPT in line:
-                            # Remove prompt and add remaining text
-                            line = line.replace(self.PROMPT, '').strip()
-                            if line:
-                                response_lines.append(line)
-                            break
-                        else:
-                            response_lines.append(line)
-
-                except UnicodeDecodeError:
-                    # Skip invalid characters
-                    continue
-            else:
-                # Small delay to avoid busy waiting
-                time.sleep(0.01)
-
-        # Join lines and clean up
-        response = '\n'.join(response_lines)
-
-        # Remove echo if present (command might be echoed back)
-        return response.strip()
+        if self.serial.timeout != timeout:
+            self.serial.timeout = timeout
+
+        # Block in the OS read until the prompt arrives or the timeout expires
+        raw = self.serial.read_until(b'>')
+
+        if not raw.endswith(b'>'):
+            raise TimeoutError("Response timeout")
+
+        return raw
+
+    @staticmethod
+    def _clean_response(raw: bytes) -> str:
+        """
+        Strip the prompt and blank lines from a raw response.
+
+        Args:
+            raw: Raw response bytes ending with the prompt
+
+        Returns:
+            Response string without prompt.
+        """
+        # Join non-empty lines (ELM327 terminates lines with CR) while still
+        # in bytes, then decode the cleaned response once
+        response_lines = [line.strip() for line in raw[:-1].splitlines()]
+        response = b'\n'.join(line for line in response_lines if line)
+
+        return response.decode('ascii', errors='ignore')
 
     def send_command_raw(self, command: str) -> bytes:
         """
@@ -192,22 +317,22 @@ class ELM327Connection:
         if not self.is_connected():
             raise ConnectionError("Not connected to device")
 
+        cmd_bytes = self._encode_command(command)
+
         with self.lock:
-            self.serial.reset_input_buffer()
-            self.serial.write((command + '\r').encode('ascii'))
+            if self._needs_flush:
+                self.serial.reset_input_buffer()
+                self._needs_flush = False
+
+            self.serial.write(cmd_bytes)
             time.sleep(0.1)
 
             # Read until prompt
-            response = b''
-            start_time = time.time()
-
-            while time.time() - start_time < self.timeout:
-                if self.serial.in_waiting > 0:
-                    data = self.serial.read(self.serial.in_waiting)
-                    response += data
-                    if b'>' in response:
-                        break
-                time.sleep(0.01)
+            if self.serial.timeout != self.timeout:
+                self.serial.timeout = self.timeout
+            response = self.serial.read_until(b'>')
+            if not response.endswith(b'>'):
+                self._needs_flush = True
 
             return response
 
@@ -2,10 +2,84 @@
 Custom PID management and loading from JSON configuration.
 """
 
-import json
+import logging
 from typing import Dict, List, Callable, Any
 from pathlib import Path
 from data.pid_definitions import PIDDefinition
+from utils.helpers import json_dumps, json_loads
+
+log = logging.getLogger(__name__)
+
+# ijson (optional dependency) lets large configs be parsed incrementally
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+# Prebuilt decoders for the most common formulas: (required bytes, decoder)
+_COMMON_FORMULAS = {
+    'A': (1, lambda data: data[0]),
+    'A-40': (1, lambda data: data[0] - 40),
+    '(A-40)': (1, lambda data: data[0] - 40),
+    'A/4': (1, lambda data: data[0] / 4),
+    'A*256+B': (2, lambda data: data[0] * 256 + data[1]),
+    '(A*256+B)/4': (2, lambda data: (data[0] * 256 + data[1]) / 4),
+}
+
+# Defaults for optional keys in a PID config entry ('description' falls back to 'name')
+_PID_DEFAULTS = {
+    'mode': 1,
+    'description': None,
+    'unit': '',
+    'formula': 'A',
+    'num_bytes': 1,
+    'min_val': 0,
+    'max_val': 100,
+}
+
+# Formulas are evaluated without access to the full builtins namespace; only
+# these numeric builtins are available to them
+_FORMULA_GLOBALS = {
+    '__builtins__': {},
+    'abs': abs, 'min': min, 'max': max, 'round': round,
+    'int': int, 'float': float, 'pow': pow, 'sum': sum, 'len': len,
+}
+
+# Compiled formula functions keyed by expression, shared across PID definitions
+_FORMULA_CACHE: Dict[str, Callable[[List[int]], Any]] = {}
+
+
+def _compile_formula(formula_eval: str) -> Callable[[List[int]], Any]:
+    """
+    Compile a formula expression over 'data' into a plain function.
+
+    Args:
+        formula_eval: Python expression (e.g., "data[0]*256+data[1]")
+
+    Returns:
+        Function taking the data bytes; raises if the formula is invalid.
+    """
+    try:
+        # Validate that the formula is a single expression before wrapping it
+        code = compile(formula_eval, '<pid_formula>', 'eval')
+    except SyntaxError as e:
+        log.warning("Invalid PID formula '%s': %s; values will be shown as raw bytes",
+                    formula_eval, e)
+
+        def _invalid(data: List[int]) -> Any:
+            raise ValueError(f"Invalid formula '{formula_eval}': {e}")
+        return _invalid
+
+    # Names outside the allow-list fail on every decode, so say so up front
+    unknown = sorted(set(code.co_names) - _FORMULA_GLOBALS.keys() - {'data'})
+    if unknown:
+        log.warning("PID formula '%s' uses unavailable names %s; values will be "
+                    "shown as raw bytes", formula_eval, ', '.join(unknown))
+
+    namespace = dict(_FORMULA_GLOBALS)
+    exec(f'def _decode(data):\n    return {formula_eval}\n', namespace)
+    return namespace['_decode']
 
 
 class CustomPIDManager:
@@ -34,14 +108,19 @@ class CustomPIDManager:
             return
 
         try:
-            with open(path, 'r') as f:
-                data = json.load(f)
+            if ijson is not None:
+                # Stream PID entries one at a time instead of materializing the file
+                with open(path, 'rb') as f:
+                    for pid_data in ijson.items(f, 'pids.item', use_float=True):
+                        self._add_pid_from_dict(pid_data)
+            else:
+                data = json_loads(Path(path).read_bytes())
 
-            for pid_data in data.get('pids', []):
-                self._add_pid_from_dict(pid_data)
+                for pid_data in data.get('pids', []):
+                    self._add_pid_from_dict(pid_data)
 
         except Exception as e:
-            print(f"Error loading custom PIDs: {str(e)}")
+            log.warning("Error loading custom PIDs: %s", e)
 
     def save_to_json(self, file_path: str = None):
         """
@@ -75,10 +154,9 @@ class CustomPIDManager:
         data = {'pids': pids_data}
 
         try:
-            with open(path, 'w') as f:
-                json.dump(data, f, indent=2)
+            Path(path).write_bytes(json_dumps(data))
         except Exception as e:
-            print(f"Error saving custom PIDs: {str(e)}")
+            log.warning("Error saving custom PIDs: %s", e)
 
     def add_pid(self, mode: int, pid_def: PIDDefinition):
         """
@@ -133,32 +211,29 @@ class CustomPIDManager:
         Args:
             pid_data: Dictionary with PID data
         """
-        mode = pid_data.get('mode', 1)
-        pid = pid_data['pid']
-        name = pid_data['name']
-        description = pid_data.get('description', name)
-        unit = pid_data.get('unit', '')
-        formula = pid_data.get('formula', 'A')
-        num_bytes = pid_data.get('num_bytes', 1)
-        min_val = pid_data.get('min_val', 0)
-        max_val = pid_data.get('max_val', 100)
+        merged = {**_PID_DEFAULTS, **pid_data}
+        name = merged['name']
+        description = merged['description']
+        if description is None:
+            description = name
+        num_bytes = merged['num_bytes']
 
         # Create decoder function from formula
-        decoder = self._formula_to_decoder(formula, num_bytes)
+        decoder = self._formula_to_decoder(merged['formula'], num_bytes)
 
         # Create PID definition
         pid_def = PIDDefinition(
-            pid=pid,
+            pid=merged['pid'],
             name=name,
             description=description,
-            unit=unit,
+            unit=merged['unit'],
             decoder=decoder,
             num_bytes=num_bytes,
-            min_val=min_val,
-            max_val=max_val
+            min_val=merged['min_val'],
+            max_val=merged['max_val']
         )
 
-        self.add_pid(mode, pid_def)
+        self.add_pid(merged['mode'], pid_def)
 
     def _formula_to_decoder(self, formula: str, num_bytes: int) -> Callable[[List[int]], Any]:
         """
@@ -171,25 +246,38 @@ class CustomPIDManager:
         Returns:
             Decoder function.
         """
-        # Replace A, B, C, D with data[0], data[1], etc.
-        formula_eval = formula.replace('A', 'data[0]')
-
-        if num_bytes >= 2:
-            formula_eval = formula_eval.replace('B', 'data[1]')
-        if num_bytes >= 3:
-            formula_eval = formula_eval.replace('C', 'data[2]')
-        if num_bytes >= 4:
-            formula_eval = formula_eval.replace('D', 'data[3]')
+        common = _COMMON_FORMULAS.get(formula.replace(' ', ''))
+
+        if common is not None and num_bytes >= common[0]:
+            evaluate = common[1]
+        else:
+            # Replace A, B, C, D with data[0], data[1], etc.
+            formula_eval = formula.replace('A', 'data[0]')
+
+            if num_bytes >= 2:
+                formula_eval = formula_eval.replace('B', 'data[1]')
+            if num_bytes >= 3:
+                formula_eval = formula_eval.replace('C', 'data[2]')
+            if num_bytes >= 4:
+                formula_eval = formula_eval.replace('D', 'data[3]')
+
+            # Compile once per distinct expression; PIDs sharing a formula share the function
+            evaluate = _FORMULA_CACHE.get(formula_eval)
+            if evaluate is None:
+                evaluate = _compile_formula(formula_eval)
+                _FORMULA_CACHE[formula_eval] = evaluate
 
         def decoder(data: List[int]) -> Any:
             try:
                 # Evaluate formula
-                result = eval(formula_eval)
-                return result
+                return evaluate(data)
             except Exception:
                 # Return raw bytes if formula fails
                 return ' '.join([f'{b:02X}' for b in data])
 
+        # Keep the source formula so it can be saved back to JSON
+        decoder.formula = formula
+
         return decoder
 
     def _decoder_to_formula(self, decoder: Callable) -> str:
@@ -202,6 +290,4 @@ class CustomPIDManager:
         Returns:
             Formula string (or 'custom' if cannot determine)
         """
-        # This is a simplified reverse mapping
-        # In practice, we'd need to store the original formula
-        return 'custom'
+        return getattr(decoder, 'formula', 'custom')
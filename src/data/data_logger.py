@@ -3,9 +3,15 @@ Data logging functionality for recording OBD sessions to CSV.
 """
 
 import csv
+import logging
+import os
+import time
 from datetime import datetime
 from typing import List, Dict, Any
 from pathlib import Path
+from utils.helpers import format_local_time
+
+log = logging.getLogger(__name__)
 
 
 class DataLogger:
@@ -27,6 +33,13 @@ class DataLogger:
         self.columns = []
         self.logging = False
 
+        # Rows are buffered and written in batches to limit write/flush calls
+        self._row_buffer: List[List[Any]] = []
+        self._data_cols: List[str] = []
+        self._buffer_limit = 64
+        self._flush_interval = 0.5
+        self._last_flush = time.monotonic()
+
     def start_logging(self, columns: List[str], filename: str = None):
         """
         Start logging session.
@@ -47,10 +60,13 @@ class DataLogger:
         self.columns = ['timestamp'] + columns
 
         # Open file and create CSV writer
-        self.file_handle = open(self.current_file, 'w', newline='')
-        self.csv_writer = csv.DictWriter(self.file_handle, fieldnames=self.columns)
-        self.csv_writer.writeheader()
+        self.file_handle = open(self.current_file, 'w', newline='', buffering=1 << 16)
+        self.csv_writer = csv.writer(self.file_handle)
+        self.csv_writer.writerow(self.columns)
+        self._data_cols = self.columns[1:]  # Skip timestamp column
 
+        self._row_buffer.clear()
+        self._last_flush = time.monotonic()
         self.logging = True
 
     def log_data(self, data: Dict[str, Any]):
@@ -63,21 +79,32 @@ class DataLogger:
         if not self.logging:
             return
 
-        # Add timestamp
-        row = {
-            'timestamp': datetime.now().isoformat()
-        }
+        # Timestamp followed by data values in column order
+        row = [self._timestamp()]
+        row.extend([data.get(col, '') for col in self._data_cols])
 
-        # Add data values
-        for col in self.columns[1:]:  # Skip timestamp column
-            row[col] = data.get(col, '')
+        # Buffer row, write out when the batch is full or stale
+        self._row_buffer.append(row)
+        if (len(self._row_buffer) >= self._buffer_limit
+                or time.monotonic() - self._last_flush > self._flush_interval):
+            self._flush_rows()
 
-        # Write row
+    def _timestamp(self) -> str:
+        """Get current local time in ISO 8601 format with microseconds."""
+        sec, ns = divmod(time.time_ns(), 1_000_000_000)
+        return f"{format_local_time('%Y-%m-%dT%H:%M:%S', sec)}.{ns // 1000:06d}"
+
+    def _flush_rows(self):
+        """Write buffered rows to the log file."""
         try:
-            self.csv_writer.writerow(row)
-            self.file_handle.flush()  # Ensure data is written immediately
+            if self._row_buffer:
+                self.csv_writer.writerows(self._row_buffer)
+            self.file_handle.flush()
         except Exception as e:
-            print(f"Error writing log data: {str(e)}")
+            log.warning("Error writing log data: %s", e)
+        finally:
+            self._row_buffer.clear()
+            self._last_flush = time.monotonic()
 
     def stop_logging(self):
         """Stop logging and close file."""
@@ -85,6 +112,7 @@ class DataLogger:
             return
 
         if self.file_handle:
+            self._flush_rows()
             self.file_handle.close()
 
         self.logging = False
@@ -109,8 +137,13 @@ class DataLogger:
         Returns:
             List of log file paths.
         """
-        log_files = list(self.log_dir.glob('*.csv'))
-        return [str(f) for f in sorted(log_files, reverse=True)]
+        # scandir entries carry cached file type info, avoiding a stat per file
+        with os.scandir(self.log_dir) as entries:
+            log_files = [entry.path for entry in entries
+                         if entry.name.endswith('.csv') and entry.is_file()]
+
+        log_files.sort(reverse=True)
+        return log_files
 
     def export_to_csv(self, data_points: List[Dict[str, Any]], filename: str, columns: List[str]):
         """
@@ -129,7 +162,7 @@ class DataLogger:
                 writer.writeheader()
                 writer.writerows(data_points)
         except Exception as e:
-            print(f"Error exporting to CSV: {str(e)}")
+            log.warning("Error exporting to CSV: %s", e)
 
     def __del__(self):
         """Cleanup on deletion."""
@@ -2,16 +2,54 @@
 Diagnostic Trouble Code (DTC) handling and decoding.
 """
 
-from typing import List, Dict, Optional
+import sys
+from collections import defaultdict
+from enum import IntEnum
+from typing import List, Dict, Optional, Union
 from dataclasses import dataclass
+from types import MappingProxyType
+
+
+# Generic description by code system letter, used when a code is not known
+_PREFIX_MAP = {
+    'P': sys.intern('Powertrain fault'),
+    'C': sys.intern('Chassis fault'),
+    'B': sys.intern('Body fault'),
+    'U': sys.intern('Network/communication fault'),
+}
+
+
+class DTCType(IntEnum):
+    """Kind of DTC, by the OBD mode it was read with."""
+    STORED = 0      # Mode 03
+    PENDING = 1     # Mode 07
+    PERMANENT = 2   # Mode 0A
+
+
+def _to_dtc_type(dtc_type: Union[str, DTCType]) -> DTCType:
+    """
+    Accept either a DTCType or its name ('stored', 'pending', 'permanent').
+
+    Raises:
+        ValueError: If a name is not one of the DTC types.
+    """
+    if isinstance(dtc_type, str):
+        try:
+            return DTCType[dtc_type.upper()]
+        except KeyError:
+            valid = ', '.join(repr(t.name.lower()) for t in DTCType)
+            raise ValueError(f"Unknown DTC type {dtc_type!r}; expected one of {valid}") from None
+    return dtc_type
 
 
 @dataclass
 class DTC:
     """Diagnostic Trouble Code."""
+    __slots__ = ('code', 'description', 'type')
+
     code: str
     description: str
-    type: str  # 'stored', 'pending', or 'permanent'
+    type: DTCType
 
     def __str__(self) -> str:
         return f"{self.code}: {self.description}"
@@ -21,7 +59,7 @@ class DTCHandler:
     """Handler for diagnostic trouble codes."""
 
     # Standard DTC descriptions (subset of common codes)
-    DTC_DESCRIPTIONS = {
+    DTC_DESCRIPTIONS = MappingProxyType({code: sys.intern(description) for code, description in {
         'P0000': 'No fault',
         'P0100': 'Mass or Volume Air Flow Circuit Malfunction',
         'P0101': 'Mass or Volume Air Flow Circuit Range/Performance Problem',
@@ -85,12 +123,20 @@ class DTCHandler:
         'P0700': 'Transmission Control System Malfunction',
         'P0705': 'Transmission Range Sensor Circuit Malfunction (PRNDL Input)',
         'P0710': 'Transmission Fluid Temperature Sensor Circuit Malfunction',
-    }
+    }.items()})
+
+    # Severity of common codes; anything not listed is 'low'
+    _SEVERITY = {code: 'critical' for code in ('P0100', 'P0300', 'P0301', 'P0302', 'P0303', 'P0304')}
+    _SEVERITY.update({code: 'high' for code in ('P0171', 'P0172', 'P0420', 'P0430', 'P0500')})
+    _SEVERITY.update({code: 'medium' for code in ('P0440', 'P0455', 'P0700')})
 
     def __init__(self):
         """Initialize DTC handler."""
         self.custom_descriptions = {}
 
+        # Standard descriptions overlaid with custom ones, so decoding is one lookup
+        self._descriptions = dict(self.DTC_DESCRIPTIONS)
+
     def decode_dtc(self, code: str) -> str:
         """
         Get description for DTC code.
@@ -101,26 +147,13 @@ class DTCHandler:
         Returns:
             Description string.
         """
-        # Check custom descriptions first
-        if code in self.custom_descriptions:
-            return self.custom_descriptions[code]
-
-        # Check standard descriptions
-        if code in self.DTC_DESCRIPTIONS:
-            return self.DTC_DESCRIPTIONS[code]
+        # Custom descriptions take precedence over standard ones
+        description = self._descriptions.get(code)
+        if description is not None:
+            return description
 
         # Return generic description based on code prefix
-        prefix = code[0]
-        if prefix == 'P':
-            return 'Powertrain fault'
-        elif prefix == 'C':
-            return 'Chassis fault'
-        elif prefix == 'B':
-            return 'Body fault'
-        elif prefix == 'U':
-            return 'Network/communication fault'
-        else:
-            return 'Unknown fault'
+        return _PREFIX_MAP.get(code[0], 'Unknown fault')
 
     def add_custom_description(self, code: str, description: str):
         """
@@ -131,47 +164,69 @@ class DTCHandler:
             description: Description text
         """
         self.custom_descriptions[code] = description
+        self._descriptions[code] = description
 
-    def create_dtc_object(self, code: str, dtc_type: str = 'stored') -> DTC:
+    def create_dtc_object(self, code: str,
+                          dtc_type: Union[str, DTCType] = DTCType.STORED) -> DTC:
         """
         Create DTC object with description.
 
         Args:
             code: DTC code
-            dtc_type: Type of DTC ('stored', 'pending', 'permanent')
+            dtc_type: Type of DTC (DTCType or 'stored', 'pending', 'permanent')
 
         Returns:
             DTC object.
         """
         description = self.decode_dtc(code)
-        return DTC(code=code, description=description, type=dtc_type)
+        return DTC(code=code, description=description, type=_to_dtc_type(dtc_type))
 
-    def parse_dtcs(self, codes: List[str], dtc_type: str = 'stored') -> List[DTC]:
+    def parse_dtcs(self, codes: List[str],
+                   dtc_type: Union[str, DTCType] = DTCType.STORED) -> List[DTC]:
         """
         Convert list of DTC codes to DTC objects.
 
         Args:
             codes: List of DTC code strings
-            dtc_type: Type of DTCs
+            dtc_type: Type of DTCs (DTCType or its lowercase name)
 
         Returns:
             List of DTC objects.
         """
-        return [self.create_dtc_object(code, dtc_type) for code in codes]
+        # Same as create_dtc_object, with the lookups hoisted out of the loop
+        dtc_type = _to_dtc_type(dtc_type)
+        decode = self.decode_dtc
+        return [DTC(code, decode(code), dtc_type) for code in codes]
 
-    def filter_by_type(self, dtcs: List[DTC], dtc_type: str) -> List[DTC]:
+    def filter_by_type(self, dtcs: List[DTC], dtc_type: Union[str, DTCType]) -> List[DTC]:
         """
         Filter DTCs by type.
 
         Args:
             dtcs: List of DTCs
-            dtc_type: Type to filter ('stored', 'pending', 'permanent')
+            dtc_type: Type to filter (DTCType or 'stored', 'pending', 'permanent')
 
         Returns:
             Filtered list.
         """
+        dtc_type = _to_dtc_type(dtc_type)
         return [dtc for dtc in dtcs if dtc.type == dtc_type]
 
+    def partition_by_type(self, dtcs: List[DTC]) -> Dict[DTCType, List[DTC]]:
+        """
+        Group DTCs by type in a single pass.
+
+        Args:
+            dtcs: List of DTCs
+
+        Returns:
+            Dictionary mapping DTCType to DTCs.
+        """
+        groups = defaultdict(list)
+        for dtc in dtcs:
+            groups[dtc.type].append(dtc)
+        return dict(groups)
+
     def get_severity(self, code: str) -> str:
         """
         Estimate severity of DTC.
@@ -183,15 +238,4 @@ class DTCHandler:
             Severity level ('low', 'medium', 'high', 'critical')
         """
         # Simple heuristic based on common codes
-        critical_codes = ['P0100', 'P0300', 'P0301', 'P0302', 'P0303', 'P0304']
-        high_codes = ['P0171', 'P0172', 'P0420', 'P0430', 'P0500']
-        medium_codes = ['P0440', 'P0455', 'P0700']
-
-        if code in critical_codes:
-            return 'critical'
-        elif code in high_codes:
-            return 'high'
-        elif code in medium_codes:
-            return 'medium'
-        else:
-            return 'low'
+        return self._SEVERITY.get(code, 'low')
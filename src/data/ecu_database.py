@@ -2,11 +2,16 @@
 ECU database for managing multiple ECU connections and information.
 """
 
-from typing import List, Dict, Optional
+import sys
+from typing import List, Dict, Optional, ValuesView
 from dataclasses import dataclass, field
+from types import MappingProxyType
 
+# dataclass(slots=True) is only available from Python 3.10
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
 
-@dataclass
+
+@dataclass(**_SLOTS)
 class ECUInfo:
     """Information about an ECU."""
     can_id: int
@@ -14,17 +19,23 @@ class ECUInfo:
     description: str = ''
     protocol: str = ''
     supported_pids: List[int] = field(default_factory=list)
+    supported_pids_mask: int = 0  # Bit N set if PID N is supported
     properties: Dict[str, any] = field(default_factory=dict)
+    _display: str = field(default='', init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Name and CAN ID are fixed once added, so format the label once
+        self._display = f"{self.name} (ID: 0x{self.can_id:03X})"
 
     def __str__(self) -> str:
-        return f"{self.name} (ID: 0x{self.can_id:03X})"
+        return self._display
 
 
 class ECUDatabase:
     """Database of ECUs found on the vehicle network."""
 
     # Common ECU names by CAN ID
-    COMMON_ECUS = {
+    COMMON_ECUS = MappingProxyType({
         0x7E8: 'Engine Control Module (ECM)',
         0x7E9: 'Transmission Control Module (TCM)',
         0x7EA: 'Anti-lock Braking System (ABS)',
@@ -33,7 +44,7 @@ class ECUDatabase:
         0x7ED: 'Airbag Control Module',
         0x7EE: 'HVAC Control Module',
         0x7EF: 'Gateway Module',
-    }
+    })
 
     def __init__(self):
         """Initialize ECU database."""
@@ -81,12 +92,21 @@ class ECUDatabase:
         """
         return self.ecus.get(can_id)
 
-    def get_all_ecus(self) -> List[ECUInfo]:
+    def get_all_ecus(self) -> ValuesView[ECUInfo]:
         """
         Get all ECUs in database.
 
         Returns:
-            List of ECU info objects.
+            Live view of ECU info objects (use snapshot() for a stable list).
+        """
+        return self.ecus.values()
+
+    def snapshot(self) -> List[ECUInfo]:
+        """
+        Get a copy of all ECUs in database.
+
+        Returns:
+            List of ECU info objects, unaffected by later changes.
         """
         return list(self.ecus.values())
 
@@ -102,6 +122,40 @@ class ECUDatabase:
         if ecu:
             ecu.supported_pids = pids
 
+            mask = 0
+            for pid in pids:
+                mask |= 1 << pid
+            ecu.supported_pids_mask = mask
+
+    def supports(self, can_id: int, pid: int) -> bool:
+        """
+        Check whether an ECU reported support for a PID.
+
+        Args:
+            can_id: CAN ID of the ECU
+            pid: PID number
+
+        Returns:
+            True if supported, False if not (or ECU unknown).
+        """
+        ecu = self.ecus.get(can_id)
+        if ecu is None:
+            return False
+        return bool((ecu.supported_pids_mask >> pid) & 1)
+
+    def ecus_supporting(self, pid: int) -> List[int]:
+        """
+        Find all ECUs that reported support for a PID.
+
+        Args:
+            pid: PID number
+
+        Returns:
+            CAN IDs of the supporting ECUs.
+        """
+        bit = 1 << pid
+        return [can_id for can_id, ecu in self.ecus.items() if ecu.supported_pids_mask & bit]
+
     def set_property(self, can_id: int, key: str, value: any):
         """
         Set a property for an ECU.
@@ -3,11 +3,15 @@ Standard OBD-II PID definitions with decoding formulas.
 """
 
 from typing import Callable, Any, List
+from types import MappingProxyType
 
 
 class PIDDefinition:
     """Definition for a single PID."""
 
+    __slots__ = ('pid', 'name', 'description', 'unit', 'decoder',
+                 'num_bytes', 'min_val', 'max_val')
+
     def __init__(self, pid: int, name: str, description: str, unit: str,
                  decoder: Callable[[List[int]], Any], num_bytes: int = 1,
                  min_val: float = 0, max_val: float = 100):
@@ -120,13 +124,28 @@ def decode_equiv_ratio(data: List[int]) -> float:
     return ((data[0] * 256) + data[1]) / 32768.0
 
 
+def decode_fuel_pressure(data: List[int]) -> int:
+    """Decode fuel pressure (A*3)."""
+    return data[0] * 3
+
+
+def decode_module_voltage(data: List[int]) -> float:
+    """Decode control module voltage ((A*256+B)/1000)."""
+    return ((data[0] * 256) + data[1]) / 1000.0
+
+
+def decode_fuel_type(data: List[int]) -> int:
+    """Decode fuel type (A)."""
+    return data[0]
+
+
 def decode_bitmap(data: List[int]) -> str:
     """Decode bitmap (return hex string)."""
-    return ' '.join([f'{b:02X}' for b in data])
+    return bytes(data).hex(' ').upper()
 
 
 # Standard Mode 01 PIDs
-STANDARD_PIDS = {
+STANDARD_PIDS = MappingProxyType({
     0x00: PIDDefinition(
         pid=0x00,
         name="PIDs_supported",
@@ -216,7 +235,7 @@ STANDARD_PIDS = {
         name="Fuel_pressure",
         description="Fuel pressure",
         unit="kPa",
-        decoder=lambda d: d[0] * 3,
+        decoder=decode_fuel_pressure,
         num_bytes=1,
         min_val=0,
         max_val=765
@@ -336,7 +355,7 @@ STANDARD_PIDS = {
         name="Control_module_voltage",
         description="Control module voltage",
         unit="V",
-        decoder=lambda d: ((d[0] * 256) + d[1]) / 1000.0,
+        decoder=decode_module_voltage,
         num_bytes=2,
         min_val=0,
         max_val=65.535
@@ -406,7 +425,7 @@ STANDARD_PIDS = {
         name="Fuel_type",
         description="Fuel type",
         unit="",
-        decoder=lambda d: d[0],
+        decoder=decode_fuel_type,
         num_bytes=1
     ),
     0x5C: PIDDefinition(
@@ -419,15 +438,92 @@ STANDARD_PIDS = {
         min_val=-40,
         max_val=215
     ),
+})
+
+
+# Reverse lookup for get_pid_by_name
+_PID_BY_NAME = {pid_def.name: pid_def for pid_def in STANDARD_PIDS.values()}
+
+# Vectorized equivalents of the scalar decoders; each takes an (N, num_bytes)
+# float64 array of response bytes and returns N decoded values
+_BATCH_BY_DECODER = {
+    decode_percent: lambda d: d[:, 0] * (100.0 / 255.0),
+    decode_temp: lambda d: d[:, 0] - 40,
+    decode_rpm: lambda d: (d[:, 0] * 256 + d[:, 1]) / 4.0,
+    decode_speed: lambda d: d[:, 0],
+    decode_short_trim: lambda d: (d[:, 0] - 128) * (100.0 / 128.0),
+    decode_pressure: lambda d: d[:, 0],
+    decode_maf: lambda d: (d[:, 0] * 256 + d[:, 1]) / 100.0,
+    decode_timing_advance: lambda d: (d[:, 0] - 128) / 2.0,
+    decode_runtime: lambda d: d[:, 0] * 256 + d[:, 1],
+    decode_distance: lambda d: d[:, 0] * 256 + d[:, 1],
+    decode_fuel_level: lambda d: d[:, 0] * (100.0 / 255.0),
+    decode_absolute_load: lambda d: (d[:, 0] * 256 + d[:, 1]) * (100.0 / 255.0),
+    decode_equiv_ratio: lambda d: (d[:, 0] * 256 + d[:, 1]) / 32768.0,
+    decode_fuel_pressure: lambda d: d[:, 0] * 3,
+    decode_module_voltage: lambda d: (d[:, 0] * 256 + d[:, 1]) / 1000.0,
+    decode_fuel_type: lambda d: d[:, 0],
+}
+
+_BATCH_DECODERS = {
+    pid: _BATCH_BY_DECODER[pid_def.decoder]
+    for pid, pid_def in STANDARD_PIDS.items()
+    if pid_def.decoder in _BATCH_BY_DECODER
 }
 
 
+def decode_batch(pid: int, data) -> 'numpy.ndarray':
+    """
+    Decode many responses for one PID in a single vectorized operation.
+
+    Requires NumPy (optional dependency).
+
+    Args:
+        pid: PID number
+        data: Array-like of shape (N, num_bytes) with the data bytes of each response
+
+    Returns:
+        NumPy float64 array with N decoded values.
+
+    Raises:
+        KeyError: If the PID has no numeric batch decoder.
+    """
+    import numpy as np
+
+    return _BATCH_DECODERS[pid](np.asarray(data, dtype=np.float64))
+
+
+def decode_word_batch(pid: int, buf: bytes) -> 'numpy.ndarray':
+    """
+    Decode a packed block of two-byte responses for one PID.
+
+    The block is viewed as an (N, 2) byte array without copying and decoded
+    with decode_batch. Requires NumPy (optional dependency).
+
+    Args:
+        pid: PID number (must be a two-byte PID, e.g. 0x0C)
+        buf: Concatenated A, B data bytes of each response
+
+    Returns:
+        NumPy float64 array with one decoded value per response.
+
+    Raises:
+        KeyError: If the PID has no numeric batch decoder.
+        ValueError: If the PID does not have two data bytes.
+    """
+    import numpy as np
+
+    if STANDARD_PIDS[pid].num_bytes != 2:
+        raise ValueError(f"PID 0x{pid:02X} is not a two-byte PID")
+    return decode_batch(pid, np.frombuffer(buf, dtype=np.uint8).reshape(-1, 2))
+
+
 def get_pid_by_name(name: str) -> PIDDefinition:
     """Get PID definition by name."""
-    for pid_def in STANDARD_PIDS.values():
-        if pid_def.name == name:
-            return pid_def
-    raise KeyError(f"PID with name '{name}' not found")
+    pid_def = _PID_BY_NAME.get(name)
+    if pid_def is None:
+        raise KeyError(f"PID with name '{name}' not found")
+    return pid_def
 
 
 def get_common_pids() -> List[int]:
@@ -3,12 +3,28 @@ AI-powered diagnostic window for autonomous troubleshooting.
 """
 
 import dearpygui.dearpygui as dpg
-from typing import Optional
+from typing import Optional, List
 import threading
-from datetime import datetime
+import queue
+from collections import deque
+import time
 from utils.ai_diagnostic_agent import AIDiagnosticAgent
 
 
+# Number of reusable colored text lines per log tab
+LOG_RING_SIZE = 500
+
+# Log placeholder text widget -> child window holding its line ring
+LOG_WINDOWS = {
+    "ai_activity_text": "ai_activity_window",
+    "ai_command_log_text": "ai_command_log_window",
+    "ai_findings_text": "ai_findings_window",
+}
+
+# Maximum number of diagnostic events handled per rendered frame
+EVENTS_PER_FRAME = 100
+
+
 class AIDiagnosticWindow:
     """AI-powered diagnostic assistant window."""
 
@@ -24,9 +40,31 @@ class AIDiagnosticWindow:
         self.agent: Optional[AIDiagnosticAgent] = None
         self.running = False
         self.diagnostic_thread: Optional[threading.Thread] = None
+        # Bumped by every Start and Stop; a run whose number is no longer
+        # current was stopped and must leave the UI to the newer session
+        self._session = 0
 
         self._create_window()
 
+        # Resolve widget tags to item IDs once; updates then skip the alias lookup
+        self._log_ids = {tag: dpg.get_alias_id(tag) for tag in LOG_WINDOWS}
+        self._status_id = dpg.get_alias_id("ai_status_text")
+
+        # Each log tab reuses a fixed ring of hidden colored text lines, so long
+        # sessions never grow the widget count; appends are queued and applied
+        # once per frame
+        self._log_rings = {tag: self._create_ring(window) for tag, window in LOG_WINDOWS.items()}
+        self._log_next = dict.fromkeys(LOG_WINDOWS, 0)
+        self._log_pending = {tag: deque(maxlen=LOG_RING_SIZE) for tag in LOG_WINDOWS}
+
+        # Events posted by the diagnostic thread, handled on the UI thread
+        self._event_q: queue.SimpleQueue = queue.SimpleQueue()
+
+        # One long-lived worker runs diagnostic tasks as they are queued
+        self._task_q: queue.Queue = queue.Queue()
+        self.diagnostic_thread = threading.Thread(target=self._worker_loop, daemon=True)
+        self.diagnostic_thread.start()
+
     def _create_window(self):
         """Create the AI diagnostic window."""
         with dpg.window(
@@ -183,6 +221,10 @@ class AIDiagnosticWindow:
             # Close button
             dpg.add_button(label="Close", callback=self.hide, width=100)
 
+    def _create_ring(self, window: str) -> List[int]:
+        """Create the hidden, reusable text lines for a log tab."""
+        return [dpg.add_text("", parent=window, wrap=870, show=False) for _ in range(LOG_RING_SIZE)]
+
     def show(self):
         """Show the AI diagnostic window."""
         dpg.configure_item(self.window_tag, show=True)
@@ -196,6 +238,46 @@ class AIDiagnosticWindow:
         """Hide the AI diagnostic window."""
         dpg.configure_item(self.window_tag, show=False)
 
+    def on_frame(self):
+        """Apply pending UI updates (called once per rendered frame)."""
+        self._drain_events()
+        self._pump_logs()
+
+    def _drain_events(self):
+        """Handle events posted by the diagnostic thread, up to a per-frame limit."""
+        for _ in range(EVENTS_PER_FRAME):
+            try:
+                event_type, data = self._event_q.get_nowait()
+            except queue.Empty:
+                return
+            self._handle_event(event_type, data)
+
+    def _pump_logs(self):
+        """Write queued log text into the next lines of each tab's ring."""
+        # Bound locally; these are called three times per log line
+        set_value = dpg.set_value
+        configure_item = dpg.configure_item
+        move_item = dpg.move_item
+
+        for tag, pending in self._log_pending.items():
+            if not pending:
+                continue
+
+            ring = self._log_rings[tag]
+            window = LOG_WINDOWS[tag]
+            index = self._log_next[tag]
+
+            while pending:
+                text, color = pending.popleft()
+                item = ring[index]
+                set_value(item, text)
+                configure_item(item, color=color, show=True)
+                # Reused lines move to the bottom so the oldest text drops off the top
+                move_item(item, parent=window)
+                index = (index + 1) % LOG_RING_SIZE
+
+            self._log_next[tag] = index
+
     def _start_diagnostic(self):
         """Start AI diagnostic session."""
         if not self.app.connected:
@@ -227,18 +309,18 @@ class AIDiagnosticWindow:
         dpg.set_value("ai_status_text", "Running...")
         dpg.configure_item("ai_status_text", color=(100, 255, 100))
 
-        # Start diagnostic in background thread
+        # Hand the task to the background worker
         self.running = True
-        self.diagnostic_thread = threading.Thread(
-            target=self._run_diagnostic_thread,
-            args=(task,),
-            daemon=True
-        )
-        self.diagnostic_thread.start()
+        self._session += 1
+        self._task_q.put((self._session, task))
 
     def _stop_diagnostic(self):
         """Stop AI diagnostic session."""
         self.running = False
+        self._session += 1
+        if self.agent:
+            # The agent checks this between steps
+            self.agent.running = False
         dpg.configure_item("ai_start_button", enabled=True)
         dpg.configure_item("ai_stop_button", enabled=False)
         dpg.set_value("ai_status_text", "Stopped")
@@ -246,59 +328,94 @@ class AIDiagnosticWindow:
 
         self._append_activity("\n[STOPPED] Diagnostic session stopped by user.\n\n", (255, 200, 100))
 
-    def _run_diagnostic_thread(self, task: str):
+    def _worker_loop(self):
+        """Run queued diagnostic tasks until a None task is queued."""
+        while True:
+            item = self._task_q.get()
+            if item is None:
+                break
+            session, task = item
+            # Skip tasks stopped before the worker picked them up
+            if session == self._session:
+                self._run_diagnostic_thread(task, session)
+
+    def _run_diagnostic_thread(self, task: str, session: int):
         """
         Run diagnostic in background thread.
 
         Args:
             task: Diagnostic task description
+            session: Session number assigned by _start_diagnostic
         """
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        self._append_activity(
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+
+        # This runs off the UI thread, so all UI updates go through the event
+        # queue; events from a stopped session are dropped so they cannot
+        # land in the log of one started after it
+        def post(event_type: str, data: any):
+            if session == self._session:
+                self._diagnostic_callback(event_type, data)
+        post("activity", (
             f"=== AI DIAGNOSTIC SESSION STARTED ===\n"
             f"Time: {timestamp}\n"
             f"Task: {task}\n"
             f"{'=' * 50}\n\n",
             (100, 200, 255)
-        )
+        ))
 
         # Run diagnostic with callback for progress
         try:
-            self.agent.run_diagnostic(task, callback=self._diagnostic_callback)
+            self.agent.run_diagnostic(task, callback=post)
+
+            # Stopped by the user; _stop_diagnostic already updated the UI
+            if session != self._session:
+                return
 
             # Generate summary
             summary = self.agent.get_diagnostic_summary()
-            self._append_findings(summary + "\n")
+            post("findings", summary + "\n")
 
             # Update status
-            dpg.set_value("ai_status_text", "Complete")
-            dpg.configure_item("ai_status_text", color=(100, 255, 100))
+            post("status", ("Complete", (100, 255, 100)))
 
-            self._append_activity(
+            post("activity", (
                 "\n=== DIAGNOSTIC COMPLETE ===\n"
                 "Check the 'Findings & Recommendations' tab for results.\n\n",
                 (100, 255, 100)
-            )
+            ))
 
         except Exception as e:
-            self._append_activity(f"\n[ERROR] {str(e)}\n\n", (255, 100, 100))
-            dpg.set_value("ai_status_text", "Error")
-            dpg.configure_item("ai_status_text", color=(255, 100, 100))
+            post("activity", (f"\n[ERROR] {str(e)}\n\n", (255, 100, 100)))
+            post("status", ("Error", (255, 100, 100)))
 
         finally:
-            self.running = False
-            dpg.configure_item("ai_start_button", enabled=True)
-            dpg.configure_item("ai_stop_button", enabled=False)
+            # A stopped session leaves running and the buttons to any newer one
+            if session == self._session:
+                self.running = False
+                post("finished", None)
 
     def _diagnostic_callback(self, event_type: str, data: any):
         """
         Callback for diagnostic progress updates.
 
+        Only queues the event, so the agent never waits on the UI; events are
+        handled on the UI thread by _drain_events.
+
         Args:
             event_type: Type of event ('progress', 'result', 'complete')
             data: Event data
         """
+        self._event_q.put((event_type, data))
+
+    def _handle_event(self, event_type: str, data: any):
+        """
+        Apply a diagnostic event to the UI.
+
+        Args:
+            event_type: Agent event ('progress', 'result', 'complete') or
+                session event ('activity', 'findings', 'status', 'finished')
+            data: Event data
+        """
         if event_type == "progress":
             self._append_activity(f"[AI] {data}\n", (200, 200, 255))
 
@@ -328,33 +445,59 @@ class AIDiagnosticWindow:
         elif event_type == "complete":
             self._append_activity(f"\n{data}\n", (100, 255, 100))
 
+        elif event_type == "activity":
+            text, color = data
+            self._append_activity(text, color)
+
+        elif event_type == "findings":
+            self._append_findings(data)
+
+        elif event_type == "status":
+            text, color = data
+            dpg.set_value(self._status_id, text)
+            dpg.configure_item(self._status_id, color=color)
+
+        elif event_type == "finished":
+            dpg.configure_item("ai_start_button", enabled=True)
+            dpg.configure_item("ai_stop_button", enabled=False)
+
     def _clear_log(self):
         """Clear all log windows."""
-        dpg.set_value("ai_activity_text", "")
-        dpg.set_value("ai_command_log_text", "")
-        dpg.set_value("ai_findings_text", "")
+        for tag, ring in self._log_rings.items():
+            dpg.set_value(self._log_ids[tag], "")
+            for item in ring:
+                dpg.configure_item(item, show=False)
+            self._log_pending[tag].clear()
+            self._log_next[tag] = 0
+
+    def _append_log(self, tag: str, text: str, color: tuple):
+        """Queue a colored line for a log tab; it is displayed on the next frame."""
+        # Each append is its own text line, so drop the line break that ends it
+        if text.endswith("\n"):
+            text = text[:-1]
+        self._log_pending[tag].append((text, color))
 
     def _append_activity(self, text: str, color: tuple = (255, 255, 255)):
         """Append text to activity log."""
-        current = dpg.get_value("ai_activity_text")
-        dpg.set_value("ai_activity_text", current + text)
+        self._append_log("ai_activity_text", text, color)
 
     def _append_command_log(self, text: str, color: tuple = (255, 255, 255)):
         """Append text to command log."""
-        current = dpg.get_value("ai_command_log_text")
-        dpg.set_value("ai_command_log_text", current + text)
+        self._append_log("ai_command_log_text", text, color)
 
     def _append_findings(self, text: str, color: tuple = (255, 255, 255)):
         """Append text to findings."""
-        current = dpg.get_value("ai_findings_text")
-        dpg.set_value("ai_findings_text", current + text)
+        self._append_log("ai_findings_text", text, color)
 
     def _save_api_key(self):
         """Save API key."""
         api_key = dpg.get_value("ai_api_key")
         if api_key:
-            # Reinitialize agent with API key
-            self.agent = AIDiagnosticAgent(self.app, api_key)
+            # Reuse the existing agent; only its key changes
+            if self.agent is None:
+                self.agent = AIDiagnosticAgent(self.app, api_key)
+            else:
+                self.agent.set_api_key(api_key)
             self._append_activity("[INFO] API key saved. Advanced AI features enabled.\n\n", (100, 255, 100))
 
     def _export_report(self):
@@ -363,11 +506,23 @@ class AIDiagnosticWindow:
             self._append_activity("[ERROR] No diagnostic data to export.\n\n", (255, 100, 100))
             return
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
         filename = f"logs/ai_diagnostic_{timestamp}.json"
 
+        # Write the file off the UI thread so long logs don't stall rendering
+        threading.Thread(target=self._do_export, args=(filename,), daemon=True).start()
+
+    def _do_export(self, filename: str):
+        """
+        Export the diagnostic log in a background thread.
+
+        Args:
+            filename: Output filename
+        """
+        post = self._diagnostic_callback
+
         try:
             self.agent.export_log(filename)
-            self._append_activity(f"[SUCCESS] Report exported to: {filename}\n\n", (100, 255, 100))
+            post("activity", (f"[SUCCESS] Report exported to: {filename}\n\n", (100, 255, 100)))
         except Exception as e:
-            self._append_activity(f"[ERROR] Failed to export: {str(e)}\n\n", (255, 100, 100))
+            post("activity", (f"[ERROR] Failed to export: {str(e)}\n\n", (255, 100, 100)))
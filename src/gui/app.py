@@ -3,19 +3,37 @@ Main DearPyGui application for DeepDiag.
 """
 
 import dearpygui.dearpygui as dpg
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 import threading
 import time
 
 from communication import BluetoothManager, ELM327Connection
-from protocol import ELM327, OBD2Protocol, CANProtocol, PIDDecoder
 from data import DTCHandler, DataLogger, ECUDatabase, CustomPIDManager
 from utils import Config
 
 from gui.connection_window import ConnectionWindow
 from gui.debug_console import DebugConsole
 from gui.kline_helper import KLineHelper
-from gui.ai_diagnostic_window import AIDiagnosticWindow
+
+# Protocol handlers and the AI window are imported when first needed
+if TYPE_CHECKING:
+    from protocol import ELM327, OBD2Protocol, CANProtocol, PIDDecoder
+    from gui.ai_diagnostic_window import AIDiagnosticWindow
+
+
+# Menu items that are only usable while connected
+CONNECTED_MENU_ITEMS = (
+    "menu_disconnect",
+    "menu_live_data",
+    "menu_dashboard",
+    "menu_plots",
+    "menu_dtcs",
+    "menu_can_monitor",
+)
+
+# Render loop frame cap; the UI is mostly static between data updates
+MAX_FPS = 30
+FRAME_INTERVAL = 1.0 / MAX_FPS
 
 
 class DiagnosticApp:
@@ -29,16 +47,16 @@ class DiagnosticApp:
         # Communication components
         self.bt_manager = BluetoothManager()
         self.connection: Optional[ELM327Connection] = None
-        self.elm327: Optional[ELM327] = None
-        self.obd2: Optional[OBD2Protocol] = None
-        self.can: Optional[CANProtocol] = None
+        self.elm327: Optional['ELM327'] = None
+        self.obd2: Optional['OBD2Protocol'] = None
+        self.can: Optional['CANProtocol'] = None
 
         # Data components
         self.dtc_handler = DTCHandler()
         self.data_logger = DataLogger()
         self.ecu_database = ECUDatabase()
         self.custom_pid_manager = CustomPIDManager('config/custom_pids.json')
-        self.decoder = PIDDecoder()
+        self._decoder: Optional['PIDDecoder'] = None
 
         # Connection state
         self.connected = False
@@ -48,11 +66,21 @@ class DiagnosticApp:
         self.connection_window: Optional[ConnectionWindow] = None
         self.debug_console: Optional[DebugConsole] = None
         self.kline_helper: Optional[KLineHelper] = None
-        self.ai_diagnostic: Optional[AIDiagnosticWindow] = None
+        self.ai_diagnostic: Optional['AIDiagnosticWindow'] = None  # Created on first show
+        self._connected_menu_ids: list = []
 
-        # Update thread
+        # Update thread; woken early on connect/disconnect/exit
         self.update_thread = None
         self.running = False
+        self._wake = threading.Event()
+
+    @property
+    def decoder(self) -> 'PIDDecoder':
+        """PID decoder, created on first use."""
+        if self._decoder is None:
+            from protocol import PIDDecoder
+            self._decoder = PIDDecoder()
+        return self._decoder
 
     def create_gui(self):
         """Create DearPyGui interface."""
@@ -150,11 +178,13 @@ class DiagnosticApp:
         # Set main window as primary
         dpg.set_primary_window("main_window", True)
 
+        # Resolve connection-dependent menu items once
+        self._connected_menu_ids = [dpg.get_alias_id(tag) for tag in CONNECTED_MENU_ITEMS]
+
         # Create windows (hidden initially)
         self.connection_window = ConnectionWindow(self)
         self.debug_console = DebugConsole(self)
         self.kline_helper = KLineHelper(self)
-        self.ai_diagnostic = AIDiagnosticWindow(self)
 
         # Load custom PIDs
         self.custom_pid_manager.load_from_json()
@@ -170,16 +200,28 @@ class DiagnosticApp:
         self.update_thread = threading.Thread(target=self._update_loop, daemon=True)
         self.update_thread.start()
 
-        # Main rendering loop
+        # Main rendering loop, capped at MAX_FPS so an idle window does not
+        # repaint at the monitor refresh rate
+        frame_start = time.perf_counter()
         while dpg.is_dearpygui_running():
+            # Let windows apply buffered text updates once per frame
+            for window in (self.debug_console, self.kline_helper, self.ai_diagnostic):
+                if window:
+                    window.on_frame()
             dpg.render_dearpygui_frame()
 
+            elapsed = time.perf_counter() - frame_start
+            if elapsed < FRAME_INTERVAL:
+                time.sleep(FRAME_INTERVAL - elapsed)
+            frame_start = time.perf_counter()
+
         self.running = False
         self.cleanup()
 
     def cleanup(self):
         """Cleanup on exit."""
         self.running = False
+        self._wake.set()
 
         if self.connected:
             self._disconnect()
@@ -197,10 +239,12 @@ class DiagnosticApp:
             port: Serial port name
             baudrate: Connection speed
         """
+        from protocol import ELM327, OBD2Protocol, CANProtocol
+
         try:
-            # Create connection
+            # Create connection (shared by the update loop and worker threads)
             timeout = self.config.get('connection.timeout', 3.0)
-            self.connection = ELM327Connection(port, baudrate, timeout)
+            self.connection = ELM327Connection(port, baudrate, timeout, thread_safe=True)
 
             # Connect
             self.connection.connect()
@@ -225,6 +269,9 @@ class DiagnosticApp:
             # Update UI
             self._update_connection_status()
 
+            # Read voltage right away rather than at the next poll
+            self._wake.set()
+
             return True
 
         except Exception as e:
@@ -244,53 +291,49 @@ class DiagnosticApp:
         self.can = None
 
         self._update_connection_status()
+        self._wake.set()
 
     def _update_connection_status(self):
         """Update connection status in UI."""
-        if self.connected:
-            dpg.set_value("status_text", "Connected")
-            dpg.configure_item("status_text", color=(100, 255, 100))
-            dpg.set_value("port_text", self.current_port)
-
-            if self.elm327 and self.elm327.voltage:
-                dpg.set_value("voltage_text", f"{self.elm327.voltage:.1f}V")
-
-            # Enable menu items
-            dpg.configure_item("menu_disconnect", enabled=True)
-            dpg.configure_item("menu_live_data", enabled=True)
-            dpg.configure_item("menu_dashboard", enabled=True)
-            dpg.configure_item("menu_plots", enabled=True)
-            dpg.configure_item("menu_dtcs", enabled=True)
-            dpg.configure_item("menu_can_monitor", enabled=True)
-
-        else:
-            dpg.set_value("status_text", "Disconnected")
-            dpg.configure_item("status_text", color=(255, 100, 100))
-            dpg.set_value("port_text", "-")
-            dpg.set_value("voltage_text", "-")
-
-            # Disable menu items
-            dpg.configure_item("menu_disconnect", enabled=False)
-            dpg.configure_item("menu_live_data", enabled=False)
-            dpg.configure_item("menu_dashboard", enabled=False)
-            dpg.configure_item("menu_plots", enabled=False)
-            dpg.configure_item("menu_dtcs", enabled=False)
-            dpg.configure_item("menu_can_monitor", enabled=False)
+        connected = self.connected
+
+        # Apply all changes under one lock so the renderer sees them together
+        with dpg.mutex():
+            if connected:
+                dpg.set_value("status_text", "Connected")
+                dpg.configure_item("status_text", color=(100, 255, 100))
+                dpg.set_value("port_text", self.current_port)
+
+                if self.elm327 and self.elm327.voltage:
+                    dpg.set_value("voltage_text", f"{self.elm327.voltage:.1f}V")
+
+            else:
+                dpg.set_value("status_text", "Disconnected")
+                dpg.configure_item("status_text", color=(255, 100, 100))
+                dpg.set_value("port_text", "-")
+                dpg.set_value("voltage_text", "-")
+
+            # Enable menu items only while connected
+            for item in self._connected_menu_ids:
+                dpg.configure_item(item, enabled=connected)
 
     def _update_loop(self):
         """Background update loop."""
         while self.running:
-            if self.connected and self.elm327:
+            # Poll every 5 seconds while connected; otherwise sleep until woken
+            self._wake.wait(timeout=5.0 if self.connected else None)
+            self._wake.clear()
+
+            elm327 = self.elm327
+            if self.running and self.connected and elm327:
                 try:
                     # Update voltage periodically
-                    voltage = self.elm327.get_voltage()
+                    voltage = elm327.get_voltage()
                     dpg.set_value("voltage_text", f"{voltage:.1f}V")
 
                 except Exception:
                     pass
 
-            time.sleep(5.0)  # Update every 5 seconds
-
     def _setup_theme(self):
         """Setup DearPyGui theme."""
         with dpg.theme() as global_theme:
@@ -321,8 +364,10 @@ class DiagnosticApp:
 
     def _show_ai_diagnostic(self):
         """Show AI diagnostic assistant."""
-        if self.ai_diagnostic:
-            self.ai_diagnostic.show()
+        if self.ai_diagnostic is None:
+            from gui.ai_diagnostic_window import AIDiagnosticWindow
+            self.ai_diagnostic = AIDiagnosticWindow(self)
+        self.ai_diagnostic.show()
 
     def _show_live_data(self):
         """Show live data window."""
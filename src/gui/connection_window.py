@@ -2,8 +2,13 @@
 Connection window for device scanning and connection management.
 """
 
+import time
 import dearpygui.dearpygui as dpg
-from typing import List, Dict
+from typing import List, Dict, FrozenSet
+
+
+# Seconds a scan result is reused when the window is reopened
+SCAN_CACHE_TTL = 30.0
 
 
 class ConnectionWindow:
@@ -20,8 +25,11 @@ class ConnectionWindow:
         self.window_tag = "connection_window"
         self.devices: List[Dict] = []
         self.selected_device = None
+        self._scan_cache_ts = 0.0
+        self._elm_port_set: FrozenSet[str] = frozenset()
 
-        self._create_window()
+        # The window is created on first show
+        self._created = False
 
     def _create_window(self):
         """Create the connection window."""
@@ -49,9 +57,24 @@ class ConnectionWindow:
 
             dpg.add_spacer(height=5)
 
-            # Device list
+            # Device list; the table is built once and only its rows are
+            # replaced on each scan
             with dpg.group(tag="device_list_group"):
-                dpg.add_text("Click 'Scan' to find devices")
+                dpg.add_text("Click 'Scan' to find devices", tag="device_list_placeholder")
+                with dpg.table(
+                    tag="device_table",
+                    header_row=True,
+                    resizable=True,
+                    borders_innerH=True,
+                    borders_outerH=True,
+                    borders_innerV=True,
+                    borders_outerV=True,
+                    show=False
+                ):
+                    dpg.add_table_column(label="Port")
+                    dpg.add_table_column(label="Description")
+                    dpg.add_table_column(label="Type")
+                    dpg.add_table_column(label="Select")
 
             dpg.add_spacer(height=10)
 
@@ -69,7 +92,7 @@ class ConnectionWindow:
 
             # Buttons
             with dpg.group(horizontal=True):
-                dpg.add_button(label="Scan", callback=self._scan_devices, width=100)
+                dpg.add_button(label="Scan", callback=lambda: self._scan_devices(force=True), width=100)
                 dpg.add_button(
                     label="Connect",
                     callback=self._connect,
@@ -85,69 +108,93 @@ class ConnectionWindow:
             dpg.add_text("", tag="connection_status_text")
 
     def show(self):
-        """Show the connection window."""
+        """Show the connection window, creating it on first use."""
+        if not self._created:
+            self._create_window()
+            self._created = True
+
         dpg.configure_item(self.window_tag, show=True)
-        # Auto-scan on show
+        # Auto-scan on show, reusing a recent scan
         self._scan_devices()
 
     def hide(self):
         """Hide the connection window."""
         dpg.configure_item(self.window_tag, show=False)
 
-    def _scan_devices(self):
-        """Scan for available devices."""
+    def _scan_devices(self, force: bool = False):
+        """
+        Scan for available devices.
+
+        Unless forced (as by the Scan button), a scan from the last
+        SCAN_CACHE_TTL seconds is kept on screen as is.
+
+        Args:
+            force: Enumerate ports again even if the last scan is recent
+        """
+        if (not force and self.devices
+                and time.monotonic() - self._scan_cache_ts < SCAN_CACHE_TTL):
+            return
+
         dpg.set_value("connection_status_text", "Scanning...")
 
         # Scan for devices
-        self.devices = self.app.bt_manager.scan_devices()
+        self.devices = self.app.bt_manager.scan_devices(force=force)
+        self._scan_cache_ts = time.monotonic()
 
         # Filter for likely ELM327 devices
         elm_devices = self.app.bt_manager.get_elm327_devices()
+        self._elm_port_set = frozenset(d['port'] for d in elm_devices)
+
+        # Only highlight ELM327 candidates when the filter actually narrowed the list
+        highlight_elm = len(self._elm_port_set) < len(self.devices)
+
+        # Work out each row before touching the UI
+        rows = []
+        for device in self.devices:
+            # Check if this is a Bluetooth port pair
+            is_outgoing = self.app.bt_manager.is_likely_outgoing_port(device['port'])
+
+            port_type = ""
+            port_color = (255, 255, 255)  # White
+            if is_outgoing is True:
+                port_type = "✓ Outgoing (USE)"
+                port_color = (100, 255, 100)  # Green
+            elif is_outgoing is False:
+                port_type = "✗ Incoming (SKIP)"
+                port_color = (150, 150, 150)  # Gray
+
+            desc_color = (255, 255, 255)  # White
+            if highlight_elm and device['port'] in self._elm_port_set:
+                desc_color = (100, 200, 255)  # Light blue
+
+            rows.append((device, port_type, port_color, desc_color))
+
+        # Replace the table rows (slot 1; the columns in slot 0 are kept)
+        # in one transaction
+        add_table_row = dpg.add_table_row
+        add_text = dpg.add_text
+        add_radio_button = dpg.add_radio_button
+
+        with dpg.mutex():
+            dpg.delete_item("device_table", children_only=True, slot=1)
+
+            for device, port_type, port_color, desc_color in rows:
+                row = add_table_row(parent="device_table")
+                add_text(device['port'], color=port_color, parent=row)
+                add_text(device['description'], color=desc_color, parent=row)
+                add_text(port_type, color=port_color, parent=row)
+                add_radio_button(
+                    items=[" "],
+                    callback=self._on_row_select,
+                    user_data=device,
+                    horizontal=True,
+                    parent=row
+                )
 
-        # Update device list
-        dpg.delete_item("device_list_group", children_only=True)
-
-        if not self.devices:
-            with dpg.group(parent="device_list_group"):
-                dpg.add_text("No devices found")
-        else:
-            with dpg.group(parent="device_list_group"):
-                with dpg.table(
-                    header_row=True,
-                    resizable=True,
-                    borders_innerH=True,
-                    borders_outerH=True,
-                    borders_innerV=True,
-                    borders_outerV=True
-                ):
-                    dpg.add_table_column(label="Port")
-                    dpg.add_table_column(label="Description")
-                    dpg.add_table_column(label="Type")
-                    dpg.add_table_column(label="Select")
-
-                    for device in self.devices:
-                        # Check if this is a Bluetooth port pair
-                        is_outgoing = self.app.bt_manager.is_likely_outgoing_port(device['port'])
-
-                        port_type = ""
-                        port_color = (255, 255, 255)  # White
-                        if is_outgoing is True:
-                            port_type = "✓ Outgoing (USE)"
-                            port_color = (100, 255, 100)  # Green
-                        elif is_outgoing is False:
-                            port_type = "✗ Incoming (SKIP)"
-                            port_color = (150, 150, 150)  # Gray
-
-                        with dpg.table_row():
-                            dpg.add_text(device['port'], color=port_color)
-                            dpg.add_text(device['description'])
-                            dpg.add_text(port_type, color=port_color)
-                            dpg.add_radio_button(
-                                items=[" "],
-                                callback=lambda s, a, u: self._select_device(u),
-                                user_data=device,
-                                horizontal=True
-                            )
+            dpg.configure_item("device_table", show=bool(rows))
+            dpg.configure_item("device_list_placeholder", show=not rows)
+            if not rows:
+                dpg.set_value("device_list_placeholder", "No devices found")
 
         status = f"Found {len(self.devices)} device(s)"
         if elm_devices and len(elm_devices) < len(self.devices):
@@ -158,6 +205,10 @@ class ConnectionWindow:
         # Disable connect button
         dpg.configure_item("connect_button", enabled=False)
 
+    def _on_row_select(self, sender, app_data, user_data: Dict):
+        """Radio button callback shared by all device rows."""
+        self._select_device(user_data)
+
     def _select_device(self, device: Dict):
         """
         Select a device for connection.
@@ -2,9 +2,23 @@
 Debug console for raw ELM327 command testing.
 """
 
+import queue
+import threading
 import dearpygui.dearpygui as dpg
-from datetime import datetime
-from typing import List
+from collections import deque
+from typing import Deque
+from utils.helpers import format_local_time
+
+
+# Maximum number of output segments kept in the console
+CONSOLE_MAX_SEGMENTS = 2000
+
+# Number of past commands remembered
+COMMAND_HISTORY_SIZE = 500
+
+# Text shown in the console when it opens
+_CONSOLE_GREETING = ("Console ready. Type commands below and press Enter.\n"
+                     "Common commands: ATZ (reset), ATI (version), ATRV (voltage), 010C (RPM)")
 
 
 class DebugConsole:
@@ -19,10 +33,20 @@ class DebugConsole:
         """
         self.app = app
         self.window_tag = "debug_console_window"
-        self.command_history: List[str] = []
+        self.command_history: Deque[str] = deque(maxlen=COMMAND_HISTORY_SIZE)
         self.history_index = -1
 
-        self._create_window()
+        # The window and its worker are created on first show
+        self._created = False
+
+        # Output is collected here and pushed to the widget once per frame
+        self._output = deque([_CONSOLE_GREETING], maxlen=CONSOLE_MAX_SEGMENTS)
+        self._output_dirty = False
+
+        # Commands are sent in order by one worker thread so a slow adapter
+        # never blocks the render loop; output comes back through _output_q
+        self._command_q: queue.Queue = queue.Queue()
+        self._output_q: queue.SimpleQueue = queue.SimpleQueue()
 
     def _create_window(self):
         """Create the debug console window."""
@@ -47,8 +71,7 @@ class DebugConsole:
                 border=True
             ):
                 dpg.add_text(
-                    "Console ready. Type commands below and press Enter.\n"
-                    "Common commands: ATZ (reset), ATI (version), ATRV (voltage), 010C (RPM)",
+                    _CONSOLE_GREETING,
                     tag="console_text",
                     wrap=780
                 )
@@ -62,7 +85,7 @@ class DebugConsole:
                     tag="console_input",
                     width=-150,
                     on_enter=True,
-                    callback=self._send_command
+                    callback=self._on_input_enter
                 )
                 dpg.add_button(
                     label="Send",
@@ -80,24 +103,57 @@ class DebugConsole:
             # Quick commands
             dpg.add_text("Quick Commands:")
             with dpg.group(horizontal=True):
-                dpg.add_button(label="ATZ (Reset)", callback=lambda: self._quick_command("ATZ"), width=120)
-                dpg.add_button(label="ATI (Version)", callback=lambda: self._quick_command("ATI"), width=120)
-                dpg.add_button(label="ATRV (Voltage)", callback=lambda: self._quick_command("ATRV"), width=120)
-                dpg.add_button(label="ATDP (Protocol)", callback=lambda: self._quick_command("ATDP"), width=120)
-                dpg.add_button(label="010C (RPM)", callback=lambda: self._quick_command("010C"), width=120)
+                dpg.add_button(label="ATZ (Reset)", callback=self._on_quick_command, user_data="ATZ", width=120)
+                dpg.add_button(label="ATI (Version)", callback=self._on_quick_command, user_data="ATI", width=120)
+                dpg.add_button(label="ATRV (Voltage)", callback=self._on_quick_command, user_data="ATRV", width=120)
+                dpg.add_button(label="ATDP (Protocol)", callback=self._on_quick_command, user_data="ATDP", width=120)
+                dpg.add_button(label="010C (RPM)", callback=self._on_quick_command, user_data="010C", width=120)
 
     def show(self):
-        """Show the debug console window."""
+        """Show the debug console window, creating it on first use."""
+        if not self._created:
+            self._create_window()
+            threading.Thread(target=self._command_worker, daemon=True).start()
+            self._created = True
+
         dpg.configure_item(self.window_tag, show=True)
 
     def hide(self):
         """Hide the debug console window."""
         dpg.configure_item(self.window_tag, show=False)
 
+    def on_frame(self):
+        """Push pending output to the console (called once per rendered frame)."""
+        if not self._created:
+            return
+
+        while True:
+            try:
+                text = self._output_q.get_nowait()
+            except queue.Empty:
+                break
+            self._output.append(text)
+            self._output_dirty = True
+
+        if self._output_dirty:
+            self._output_dirty = False
+            dpg.set_value("console_text", "".join(self._output))
+
+    def _on_input_enter(self, sender, app_data):
+        """Send the entered command; DearPyGui passes the input text as app_data."""
+        self._submit_command(app_data)
+
     def _send_command(self):
         """Send command from input field."""
-        command = dpg.get_value("console_input")
+        self._submit_command(dpg.get_value("console_input"))
 
+    def _submit_command(self, command: str):
+        """
+        Record a command in the history and queue it for sending.
+
+        Args:
+            command: Command string to send
+        """
         if not command:
             return
 
@@ -111,17 +167,8 @@ class DebugConsole:
             dpg.set_value("console_input", "")
             return
 
-        # Show command
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        self._append_output(f"\n[{timestamp}] > {command}", color=(100, 200, 255))
-
-        # Send command
-        try:
-            response = self.app.connection.send_command(command)
-            self._append_output(f"  {response}", color=(200, 255, 200))
-
-        except Exception as e:
-            self._append_output(f"  ERROR: {str(e)}", color=(255, 100, 100))
+        # Send command on the worker thread, which also echoes it
+        self._command_q.put(command)
 
         # Clear input
         dpg.set_value("console_input", "")
@@ -129,6 +176,37 @@ class DebugConsole:
         # Auto-scroll to bottom
         self._scroll_to_bottom()
 
+    def _command_worker(self):
+        """Send queued commands to the adapter and post their responses."""
+        while True:
+            command = self._command_q.get()
+
+            # Show command
+            timestamp = format_local_time()
+            self._output_q.put(f"\n[{timestamp}] > {command}")
+
+            connection = self.app.connection
+            if connection is None:
+                self._output_q.put("  ERROR: Not connected to device")
+                continue
+
+            try:
+                response = connection.send_command(command)
+                self._output_q.put(f"  {response}")
+
+                # AT commands may change settings the protocol handlers cache
+                if command[:2].upper() == 'AT':
+                    for handler in (self.app.elm327, self.app.can):
+                        if handler is not None:
+                            handler.reset_state()
+
+            except Exception as e:
+                self._output_q.put(f"  ERROR: {str(e)}")
+
+    def _on_quick_command(self, sender, app_data, user_data: str):
+        """Quick command button callback shared by all buttons; user_data is the command."""
+        self._quick_command(user_data)
+
     def _quick_command(self, command: str):
         """
         Execute a quick command.
@@ -136,8 +214,7 @@ class DebugConsole:
         Args:
             command: Command string to execute
         """
-        dpg.set_value("console_input", command)
-        self._send_command()
+        self._submit_command(command)
 
     def _append_output(self, text: str, color: tuple = (255, 255, 255)):
         """
@@ -147,12 +224,14 @@ class DebugConsole:
             text: Text to append
             color: RGB color tuple
         """
-        current_text = dpg.get_value("console_text")
-        dpg.set_value("console_text", current_text + text)
+        self._output.append(text)
+        self._output_dirty = True
 
     def _clear_console(self):
         """Clear console output."""
-        dpg.set_value("console_text", "Console cleared.\n")
+        self._output.clear()
+        self._output.append("Console cleared.\n")
+        self._output_dirty = True
 
     def _scroll_to_bottom(self):
         """Scroll console output to bottom."""
@@ -2,13 +2,78 @@
 K-line (ISO 9141-2 / ISO 14230-4) troubleshooting helper window.
 """
 
+import queue
+import re
+import threading
 import dearpygui.dearpygui as dpg
-from typing import List, Tuple
+from collections import deque
+from typing import Callable, List, Optional, Tuple
+
+
+# Maximum number of result segments kept in the results display
+RESULTS_MAX_SEGMENTS = 2000
+
+# Protocol radio button items and the ATSP code each one selects
+_PROTOCOL_ITEMS = ("Auto Detect", "ISO 9141-2 (Protocol 3)",
+                   "KWP 5-baud init (Protocol 4)", "KWP fast init (Protocol 5)")
+_PROTOCOL_SELECT_TO_CODE = ("0", "3", "4", "5")
+_PROTOCOL_CODE_BY_ITEM = dict(zip(_PROTOCOL_ITEMS, _PROTOCOL_SELECT_TO_CODE))
+
+# Adaptive timing combo items and their ATAT mode
+_ADAPTIVE_COMBO_TO_CODE = {"Off (0)": "0", "Auto 1 (1)": "1", "Auto 2 (2)": "2"}
+
+# Prebuilt AT commands, indexed by their numeric argument
+_ATSP = tuple(f"ATSP{n}" for n in range(10))
+_ATH = ("ATH0", "ATH1")
+_ATS = ("ATS0", "ATS1")
+_ATAT = ("ATAT0", "ATAT1", "ATAT2")
+
+# Connection test sequence: (command, description)
+_KLINE_TESTS = (
+    ("ATDP", "Check active protocol"),
+    ("0100", "Query supported PIDs"),
+    ("010C", "Read engine RPM"),
+    ("010D", "Read vehicle speed"),
+)
+
+# Adapter replies meaning the command failed, matched in a single scan
+_NEGATIVE_RESPONSE = re.compile(r"NO DATA|ERROR|UNABLE|STOPPED|\?")
+
+# Text shown in the results area before any operation has run
+_RESULTS_HINT = ("Click 'Auto-Configure' to automatically detect best settings\n"
+                 "or 'Apply Settings' to manually configure, then 'Test Connection'")
+
+# Buttons disabled while an operation runs on the worker thread
+ACTION_BUTTONS = ("kline_auto_button", "kline_apply_button", "kline_test_button")
+
+
+def _is_negative_response(response: str) -> bool:
+    """
+    Check whether an adapter reply is empty or reports a failure.
+
+    Args:
+        response: Cleaned response string
+
+    Returns:
+        True if the command did not succeed.
+    """
+    return not response or _NEGATIVE_RESPONSE.search(response) is not None
 
 
 class KLineHelper:
     """K-line diagnostic and troubleshooting helper."""
 
+    # Result text colors
+    _C_OK = (100, 255, 100)
+    _C_OK_DIM = (150, 255, 150)
+    _C_APPLIED = (200, 255, 200)
+    _C_WARN = (255, 150, 100)
+    _C_ERR = (255, 100, 100)
+    _C_INFO = (100, 200, 255)
+    _C_HEADING = (100, 255, 255)
+    _C_DIM = (200, 200, 200)
+    _C_WHITE = (255, 255, 255)
+
     def __init__(self, app):
         """
         Initialize K-line helper.
@@ -20,7 +85,28 @@ class KLineHelper:
         self.window_tag = "kline_helper_window"
         self.test_results: List[Tuple[str, str, bool]] = []
 
-        self._create_window()
+        # Adapter commands run on a worker thread; it posts UI updates here
+        self._worker: Optional[threading.Thread] = None
+        self._event_q: queue.SimpleQueue = queue.SimpleQueue()
+
+        # Settings widget values, kept current by _on_setting_change so
+        # applying them does not have to read the widgets back
+        self._protocol_item = _PROTOCOL_ITEMS[0]
+        self._timeout = 255
+        self._headers_on = True
+        self._spaces_on = True
+        self._adaptive_item = "Auto 2 (2)"
+
+        # Last ATST timeout value and its command string
+        self._last_st: Optional[int] = None
+        self._last_st_cmd = ""
+
+        # The window is created on first show
+        self._created = False
+
+        # Results are collected here and pushed to the widget once per frame
+        self._results = deque([_RESULTS_HINT], maxlen=RESULTS_MAX_SEGMENTS)
+        self._results_dirty = False
 
     def _create_window(self):
         """Create the K-line helper window."""
@@ -41,11 +127,12 @@ class KLineHelper:
             dpg.add_text("Step 1: Select K-line Protocol")
             with dpg.group(horizontal=True):
                 dpg.add_radio_button(
-                    items=["Auto Detect", "ISO 9141-2 (Protocol 3)",
-                           "KWP 5-baud init (Protocol 4)", "KWP fast init (Protocol 5)"],
+                    items=_PROTOCOL_ITEMS,
                     tag="kline_protocol_select",
-                    default_value="Auto Detect",
-                    horizontal=False
+                    default_value=self._protocol_item,
+                    horizontal=False,
+                    callback=self._on_setting_change,
+                    user_data="_protocol_item"
                 )
 
             dpg.add_spacer(height=10)
@@ -53,8 +140,20 @@ class KLineHelper:
             # Configuration
             dpg.add_text("Step 2: Configure Connection Settings")
             with dpg.group(horizontal=True):
-                dpg.add_checkbox(label="Enable Headers (ATH1)", tag="kline_headers", default_value=True)
-                dpg.add_checkbox(label="Enable Spaces (ATS1)", tag="kline_spaces", default_value=True)
+                dpg.add_checkbox(
+                    label="Enable Headers (ATH1)",
+                    tag="kline_headers",
+                    default_value=self._headers_on,
+                    callback=self._on_setting_change,
+                    user_data="_headers_on"
+                )
+                dpg.add_checkbox(
+                    label="Enable Spaces (ATS1)",
+                    tag="kline_spaces",
+                    default_value=self._spaces_on,
+                    callback=self._on_setting_change,
+                    user_data="_spaces_on"
+                )
 
             dpg.add_spacer(height=5)
 
@@ -62,20 +161,24 @@ class KLineHelper:
                 dpg.add_text("Timeout:")
                 dpg.add_slider_int(
                     tag="kline_timeout",
-                    default_value=255,
+                    default_value=self._timeout,
                     min_value=1,
                     max_value=255,
-                    width=200
+                    width=200,
+                    callback=self._on_setting_change,
+                    user_data="_timeout"
                 )
                 dpg.add_text("(x4 ms)")
 
             with dpg.group(horizontal=True):
                 dpg.add_text("Adaptive Timing:")
                 dpg.add_combo(
-                    items=["Off (0)", "Auto 1 (1)", "Auto 2 (2)"],
-                    default_value="Auto 2 (2)",
+                    items=list(_ADAPTIVE_COMBO_TO_CODE),
+                    default_value=self._adaptive_item,
                     tag="kline_adaptive",
-                    width=150
+                    width=150,
+                    callback=self._on_setting_change,
+                    user_data="_adaptive_item"
                 )
 
             dpg.add_spacer(height=10)
@@ -86,17 +189,20 @@ class KLineHelper:
                 dpg.add_button(
                     label="Auto-Configure",
                     callback=self._auto_configure,
-                    width=150
+                    width=150,
+                    tag="kline_auto_button"
                 )
                 dpg.add_button(
                     label="Apply Settings",
                     callback=self._apply_settings,
-                    width=150
+                    width=150,
+                    tag="kline_apply_button"
                 )
                 dpg.add_button(
                     label="Test Connection",
                     callback=self._test_connection,
-                    width=150
+                    width=150,
+                    tag="kline_test_button"
                 )
 
             dpg.add_spacer(height=10)
@@ -112,8 +218,7 @@ class KLineHelper:
                 border=True
             ):
                 dpg.add_text(
-                    "Click 'Auto-Configure' to automatically detect best settings\n"
-                    "or 'Apply Settings' to manually configure, then 'Test Connection'",
+                    _RESULTS_HINT,
                     tag="kline_results_text",
                     wrap=680
                 )
@@ -132,21 +237,102 @@ class KLineHelper:
                 )
 
     def show(self):
-        """Show the K-line helper window."""
+        """Show the K-line helper window, creating it on first use."""
+        if not self._created:
+            self._create_window()
+            self._created = True
+
         dpg.configure_item(self.window_tag, show=True)
 
     def hide(self):
         """Hide the K-line helper window."""
         dpg.configure_item(self.window_tag, show=False)
 
-    def _auto_configure(self):
-        """Automatically detect and configure K-line settings."""
+    def _on_setting_change(self, sender, app_data, user_data: str):
+        """Record a settings widget's new value in the attribute named by user_data."""
+        setattr(self, user_data, app_data)
+
+    def on_frame(self):
+        """Apply worker updates and push pending results (called once per rendered frame)."""
+        if not self._created:
+            return
+
+        while True:
+            try:
+                event_type, data = self._event_q.get_nowait()
+            except queue.Empty:
+                break
+            self._handle_event(event_type, data)
+
+        if self._results_dirty:
+            self._results_dirty = False
+            dpg.set_value("kline_results_text", "".join(self._results))
+
+    def _start_operation(self, operation: Callable, *args):
+        """
+        Run an adapter operation on a worker thread so the UI keeps rendering.
+
+        Args:
+            operation: Method that talks to the adapter
+            *args: Arguments for the operation
+        """
         if not self.app.connected or not self.app.connection:
-            self._append_result("ERROR: Not connected to ELM327 device\n", (255, 100, 100))
+            self._append_result("ERROR: Not connected to ELM327 device\n", self._C_ERR)
             return
 
+        if self._worker and self._worker.is_alive():
+            return
+
+        for tag in ACTION_BUTTONS:
+            dpg.configure_item(tag, enabled=False)
+
+        self._worker = threading.Thread(target=self._run_operation, args=(operation, args), daemon=True)
+        self._worker.start()
+
+    def _run_operation(self, operation: Callable, args: tuple):
+        """Worker thread body; re-enables the action buttons when done."""
+        try:
+            operation(*args)
+        except Exception as e:
+            self._append_result(f"\nERROR: {str(e)}\n", self._C_ERR)
+        finally:
+            self._event_q.put(("finished", None))
+
+    def _handle_event(self, event_type: str, data: any):
+        """
+        Apply an update posted by the worker thread to the UI.
+
+        Args:
+            event_type: 'result', 'clear', 'protocol', 'save_enabled' or 'finished'
+            data: Event data
+        """
+        if event_type == "result":
+            self._results.append(data)
+            self._results_dirty = True
+
+        elif event_type == "clear":
+            self._results.clear()
+            self._results_dirty = True
+
+        elif event_type == "protocol":
+            self._protocol_item = data
+            dpg.set_value("kline_protocol_select", data)
+
+        elif event_type == "save_enabled":
+            dpg.configure_item("kline_save_button", enabled=data)
+
+        elif event_type == "finished":
+            for tag in ACTION_BUTTONS:
+                dpg.configure_item(tag, enabled=True)
+
+    def _auto_configure(self):
+        """Automatically detect and configure K-line settings."""
+        self._start_operation(self._run_auto_configure)
+
+    def _run_auto_configure(self):
+        """Probe the K-line protocols in turn (runs on the worker thread)."""
         self._clear_results()
-        self._append_result("Starting auto-configuration for K-line...\n\n", (100, 200, 255))
+        self._append_result("Starting auto-configuration for K-line...\n\n", self._C_INFO)
 
         # Test protocols in order
         protocols = [
@@ -158,154 +344,175 @@ class KLineHelper:
         success_protocol = None
 
         for protocol_num, protocol_name in protocols:
-            self._append_result(f"Testing {protocol_name}...\n", (200, 200, 200))
+            self._append_result(f"Testing {protocol_name}...\n", self._C_DIM)
+
+            # This protocol's outcome is logged as one block
+            fragments = []
 
             try:
                 # Set protocol
-                self.app.connection.send_command(f"ATSP{protocol_num}")
+                self.app.connection.send_command(_ATSP[int(protocol_num)])
 
                 # Configure for K-line
                 self.app.connection.send_command("ATST FF")  # Max timeout
-                self.app.connection.send_command("ATH1")     # Headers on
-                self.app.connection.send_command("ATS1")     # Spaces on
-                self.app.connection.send_command("ATAT2")    # Adaptive timing 2
+                self.app.connection.send_command(_ATH[1])    # Headers on
+                self.app.connection.send_command(_ATS[1])    # Spaces on
+                self.app.connection.send_command(_ATAT[2])   # Adaptive timing 2
 
                 # Test with 0100 (supported PIDs)
                 response = self.app.connection.send_command("0100")
 
-                if response and "41 00" in response and "NO DATA" not in response:
-                    self._append_result(f"  ✓ SUCCESS! Protocol {protocol_num} ({protocol_name}) works!\n", (100, 255, 100))
-                    self._append_result(f"  Response: {response}\n\n", (150, 255, 150))
+                if not _is_negative_response(response) and "41 00" in response:
+                    fragments.append(f"  ✓ SUCCESS! Protocol {protocol_num} ({protocol_name}) works!\n")
+                    fragments.append(f"  Response: {response}\n\n")
                     success_protocol = protocol_num
-                    break
                 else:
-                    self._append_result(f"  ✗ No response on protocol {protocol_num}\n\n", (255, 150, 100))
+                    fragments.append(f"  ✗ No response on protocol {protocol_num}\n\n")
 
             except Exception as e:
-                self._append_result(f"  ✗ Error: {str(e)}\n\n", (255, 100, 100))
+                fragments.append(f"  ✗ Error: {str(e)}\n\n")
+
+            self._append_result_batch(fragments)
+            if success_protocol:
+                break
 
         if success_protocol:
-            self._append_result("\n=== RECOMMENDED SETTINGS ===\n", (100, 255, 255))
-            self._append_result(f"Protocol: {success_protocol}\n", (255, 255, 255))
-            self._append_result("Timeout: 255 (1020ms)\n", (255, 255, 255))
-            self._append_result("Headers: ON\n", (255, 255, 255))
-            self._append_result("Spaces: ON\n", (255, 255, 255))
-            self._append_result("Adaptive Timing: Mode 2\n", (255, 255, 255))
-            self._append_result("\nClick 'Save to Config' to remember these settings.\n", (100, 255, 100))
+            self._append_result_batch([
+                "\n=== RECOMMENDED SETTINGS ===\n",
+                f"Protocol: {success_protocol}\n",
+                "Timeout: 255 (1020ms)\n",
+                "Headers: ON\n",
+                "Spaces: ON\n",
+                "Adaptive Timing: Mode 2\n",
+                "\nClick 'Save to Config' to remember these settings.\n",
+            ])
 
             # Update UI
-            protocol_map = {"3": 1, "4": 2, "5": 3}
-            dpg.set_value("kline_protocol_select", protocol_map.get(success_protocol, 0))
-            dpg.configure_item("kline_save_button", enabled=True)
+            protocol_index = _PROTOCOL_SELECT_TO_CODE.index(success_protocol)
+            self._event_q.put(("protocol", _PROTOCOL_ITEMS[protocol_index]))
+            self._event_q.put(("save_enabled", True))
 
         else:
-            self._append_result("\n=== NO WORKING PROTOCOL FOUND ===\n", (255, 100, 100))
-            self._append_result("Possible issues:\n", (255, 255, 255))
-            self._append_result("1. Vehicle ignition must be ON\n", (255, 255, 255))
-            self._append_result("2. ELM327 must be fully plugged into OBD-II port\n", (255, 255, 255))
-            self._append_result("3. Vehicle may not support OBD-II standard PIDs\n", (255, 255, 255))
-            self._append_result("4. K-line pins may not be connected in adapter\n", (255, 255, 255))
-            self._append_result("5. Try manufacturer-specific protocols if available\n", (255, 255, 255))
+            self._append_result_batch([
+                "\n=== NO WORKING PROTOCOL FOUND ===\n",
+                "Possible issues:\n",
+                "1. Vehicle ignition must be ON\n",
+                "2. ELM327 must be fully plugged into OBD-II port\n",
+                "3. Vehicle may not support OBD-II standard PIDs\n",
+                "4. K-line pins may not be connected in adapter\n",
+                "5. Try manufacturer-specific protocols if available\n",
+            ])
 
     def _apply_settings(self):
         """Apply selected settings manually."""
-        if not self.app.connected or not self.app.connection:
-            self._append_result("ERROR: Not connected to ELM327 device\n", (255, 100, 100))
-            return
+        # Snapshot the settings on the UI thread and hand them to the worker
+        self._start_operation(
+            self._run_apply_settings,
+            self._protocol_item,
+            self._timeout,
+            self._headers_on,
+            self._spaces_on,
+            self._adaptive_item
+        )
+
+    def _run_apply_settings(self, protocol_selection, timeout: int, headers: bool,
+                            spaces: bool, adaptive_selection: str):
+        """
+        Send the selected settings to the adapter (runs on the worker thread).
 
+        Args:
+            protocol_selection: Selected protocol radio button item
+            timeout: Timeout in units of 4 ms
+            headers: Enable headers
+            spaces: Enable spaces
+            adaptive_selection: Adaptive timing combo value (e.g., "Auto 2 (2)")
+        """
         self._clear_results()
-        self._append_result("Applying K-line settings...\n\n", (100, 200, 255))
+        self._append_result("Applying K-line settings...\n\n", self._C_INFO)
 
         try:
-            # Get selected protocol
-            protocol_selection = dpg.get_value("kline_protocol_select")
-            protocol_map = {
-                0: "0",  # Auto
-                1: "3",  # ISO 9141-2
-                2: "4",  # KWP 5-baud
-                3: "5"   # KWP fast
-            }
-            protocol = protocol_map.get(protocol_selection, "0")
+            # Get selected protocol (the radio button value is the item label)
+            protocol = _PROTOCOL_CODE_BY_ITEM.get(protocol_selection, "0")
 
             # Apply protocol
+            response = self.app.connection.send_command(_ATSP[int(protocol)])
             if protocol != "0":
-                response = self.app.connection.send_command(f"ATSP{protocol}")
-                self._append_result(f"Set protocol {protocol}: {response}\n", (200, 255, 200))
+                self._append_result(f"Set protocol {protocol}: {response}\n", self._C_APPLIED)
             else:
-                response = self.app.connection.send_command("ATSP0")
-                self._append_result(f"Set auto protocol: {response}\n", (200, 255, 200))
+                self._append_result(f"Set auto protocol: {response}\n", self._C_APPLIED)
 
             # Apply timeout
-            timeout = dpg.get_value("kline_timeout")
-            response = self.app.connection.send_command(f"ATST{timeout:02X}")
-            self._append_result(f"Set timeout {timeout}x4ms: {response}\n", (200, 255, 200))
+            if timeout != self._last_st:
+                self._last_st = timeout
+                self._last_st_cmd = f"ATST{timeout:02X}"
+            response = self.app.connection.send_command(self._last_st_cmd)
+            self._append_result(f"Set timeout {timeout}x4ms: {response}\n", self._C_APPLIED)
 
             # Apply headers
-            headers = dpg.get_value("kline_headers")
-            cmd = "ATH1" if headers else "ATH0"
-            response = self.app.connection.send_command(cmd)
-            self._append_result(f"Headers {'ON' if headers else 'OFF'}: {response}\n", (200, 255, 200))
+            response = self.app.connection.send_command(_ATH[bool(headers)])
+            self._append_result(f"Headers {'ON' if headers else 'OFF'}: {response}\n", self._C_APPLIED)
 
             # Apply spaces
-            spaces = dpg.get_value("kline_spaces")
-            cmd = "ATS1" if spaces else "ATS0"
-            response = self.app.connection.send_command(cmd)
-            self._append_result(f"Spaces {'ON' if spaces else 'OFF'}: {response}\n", (200, 255, 200))
+            response = self.app.connection.send_command(_ATS[bool(spaces)])
+            self._append_result(f"Spaces {'ON' if spaces else 'OFF'}: {response}\n", self._C_APPLIED)
 
             # Apply adaptive timing
-            adaptive_selection = dpg.get_value("kline_adaptive")
-            adaptive = adaptive_selection[-2]  # Extract number from "Auto 2 (2)"
-            response = self.app.connection.send_command(f"ATAT{adaptive}")
-            self._append_result(f"Adaptive timing mode {adaptive}: {response}\n", (200, 255, 200))
+            adaptive = _ADAPTIVE_COMBO_TO_CODE[adaptive_selection]
+            response = self.app.connection.send_command(_ATAT[int(adaptive)])
+            self._append_result(f"Adaptive timing mode {adaptive}: {response}\n", self._C_APPLIED)
 
-            self._append_result("\nSettings applied successfully!\n", (100, 255, 100))
-            self._append_result("Click 'Test Connection' to verify.\n", (255, 255, 255))
+            self._append_result("\nSettings applied successfully!\n", self._C_OK)
+            self._append_result("Click 'Test Connection' to verify.\n", self._C_WHITE)
 
         except Exception as e:
-            self._append_result(f"\nERROR: {str(e)}\n", (255, 100, 100))
+            self._append_result(f"\nERROR: {str(e)}\n", self._C_ERR)
 
     def _test_connection(self):
         """Test connection with current settings."""
-        if not self.app.connected or not self.app.connection:
-            self._append_result("ERROR: Not connected to ELM327 device\n", (255, 100, 100))
-            return
+        self._start_operation(self._run_test_connection)
 
-        self._append_result("\n--- Connection Test ---\n", (100, 200, 255))
+    def _run_test_connection(self):
+        """Run the test commands (runs on the worker thread)."""
+        log = self._append_result
+        send = self.app.connection.send_command
 
-        # Test commands
-        tests = [
-            ("ATDP", "Check active protocol"),
-            ("0100", "Query supported PIDs"),
-            ("010C", "Read engine RPM"),
-            ("010D", "Read vehicle speed")
-        ]
+        log("\n--- Connection Test ---\n", self._C_INFO)
 
-        for cmd, description in tests:
+        for cmd, description in _KLINE_TESTS:
             try:
-                self._append_result(f"\n{description} ({cmd})...\n", (200, 200, 200))
-                response = self.app.connection.send_command(cmd, delay=0.5)
+                log(f"\n{description} ({cmd})...\n", self._C_DIM)
+                response = send(cmd, delay=0.5)
 
-                if response and "NO DATA" not in response and "ERROR" not in response:
-                    self._append_result(f"  ✓ {response}\n", (100, 255, 100))
+                if not _is_negative_response(response):
+                    log(f"  ✓ {response}\n", self._C_OK)
                 else:
-                    self._append_result(f"  ✗ {response or 'No response'}\n", (255, 150, 100))
+                    log(f"  ✗ {response or 'No response'}\n", self._C_WARN)
 
             except Exception as e:
-                self._append_result(f"  ✗ Error: {str(e)}\n", (255, 100, 100))
+                log(f"  ✗ Error: {str(e)}\n", self._C_ERR)
 
-        self._append_result("\nTest complete.\n", (100, 200, 255))
+        log("\nTest complete.\n", self._C_INFO)
 
     def _save_config(self):
         """Save K-line settings to configuration."""
         # TODO: Implement config save
-        self._append_result("\nConfiguration saved!\n", (100, 255, 100))
+        self._append_result("\nConfiguration saved!\n", self._C_OK)
         dpg.configure_item("kline_save_button", enabled=False)
 
-    def _append_result(self, text: str, color: tuple = (255, 255, 255)):
-        """Append text to results display."""
-        current_text = dpg.get_value("kline_results_text")
-        dpg.set_value("kline_results_text", current_text + text)
+    def _append_result(self, text: str, color: tuple = _C_WHITE):
+        """Append text to results display (safe to call from the worker thread)."""
+        self._event_q.put(("result", text))
+
+    def _append_result_batch(self, fragments: List[str]):
+        """
+        Append several lines to the results display as one update.
+
+        Args:
+            fragments: Text fragments, joined in order
+        """
+        if fragments:
+            self._event_q.put(("result", "".join(fragments)))
 
     def _clear_results(self):
-        """Clear results display."""
-        dpg.set_value("kline_results_text", "")
+        """Clear results display (safe to call from the worker thread)."""
+        self._event_q.put(("clear", None))
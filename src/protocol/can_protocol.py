@@ -2,14 +2,47 @@
 CAN protocol operations and raw CAN frame handling.
 """
 
-from typing import List, Optional, Tuple
+import re
+import struct
+from typing import List, Optional, Tuple, Union
 from communication.elm327_connection import ELM327Connection
 from communication.exceptions import InvalidResponseError
 
 
+# Big-endian packers for 29-bit and 11-bit CAN IDs
+_ID29 = struct.Struct('>I')
+_ID11 = struct.Struct('>H')
+
+
+def _format_can_id(can_id: int, extended: bool) -> str:
+    """
+    Format a CAN ID as the hex digits the ELM327 expects.
+
+    Args:
+        can_id: CAN identifier
+        extended: True for a 29-bit ID (8 digits), False for 11-bit (3 digits)
+
+    Returns:
+        Uppercase hex string.
+    """
+    if extended:
+        return _ID29.pack(can_id).hex().upper()
+    return _ID11.pack(can_id).hex().upper()[-3:]
+
+
+# A monitored frame line: hex digits and blanks only, so status text such as
+# SEARCHING... or STOPPED never matches
+_FRAME_LINE = re.compile(r'^[0-9A-Fa-f \t\r]+$', re.M)
+
+# Blanks removed from a matched frame line in a single translate pass
+_WS_TBL = str.maketrans('', '', ' \t\r')
+
+
 class CANFrame:
     """Represents a single CAN frame."""
 
+    __slots__ = ('can_id', 'data', 'extended')
+
     def __init__(self, can_id: int, data: List[int], extended: bool = False):
         """
         Initialize CAN frame.
@@ -25,7 +58,7 @@ class CANFrame:
 
     def __str__(self) -> str:
         """String representation of frame."""
-        data_hex = ' '.join([f'{b:02X}' for b in self.data])
+        data_hex = bytes(self.data).hex(' ').upper()
         id_str = f"{self.can_id:08X}" if self.extended else f"{self.can_id:03X}"
         return f"ID: {id_str}, Data: {data_hex}"
 
@@ -42,38 +75,84 @@ class CANProtocol:
         """
         self.connection = connection
 
-    def send_can_frame(self, can_id: int, data: List[int], extended: bool = False) -> bool:
+        # Last adapter settings sent, so unchanged ones are not re-sent;
+        # valid while the connection's state_generation stays the same
+        self._can_mode: Optional[bool] = None
+        self._can_filter: Optional[str] = None
+        self._can_mask: Optional[str] = None
+        self._state_gen = connection.state_generation
+
+    def reset_state(self):
+        """
+        Forget the cached CAN mode, filter and mask.
+
+        Resets and protocol changes sent on the connection are picked up
+        automatically; call this after reconfiguring the CAN settings outside
+        this handler so the next operation sends its settings again.
+        """
+        self._can_mode = None
+        self._can_filter = None
+        self._can_mask = None
+        self._state_gen = self.connection.state_generation
+
+    def _sync_state(self):
+        """Drop the cached settings if the adapter was reset since they were sent."""
+        if self._state_gen != self.connection.state_generation:
+            self.reset_state()
+
+    def send_can_frame(self, can_id: int, data: Union[List[int], bytes, bytearray],
+                       extended: bool = False) -> bool:
         """
         Send a raw CAN frame.
 
         Args:
             can_id: CAN identifier
-            data: Data bytes (up to 8 bytes)
+            data: Data bytes (up to 8 bytes), as a list of ints or bytes-like
             extended: Use 29-bit extended ID
 
         Returns:
             True if successful.
         """
-        # Set CAN ID format if needed
-        if extended:
-            # Set to 29-bit mode
-            self.connection.send_command('ATCP18')  # CAN Priority 18 (extended)
-        else:
-            # Set to 11-bit mode
-            self.connection.send_command('ATCP00')  # Standard 11-bit
+        response = self._send_and_wait(can_id, data, extended)
+
+        return 'OK' in response or response == ''
+
+    def _send_and_wait(self, can_id: int, data: Union[List[int], bytes, bytearray],
+                       extended: bool = False) -> str:
+        """
+        Send a raw CAN frame and return whatever the adapter answers with.
+
+        The adapter collects replies until its response timeout (ATST,
+        shortened by adaptive timing) expires, so no separate read is needed.
+
+        Args:
+            can_id: CAN identifier
+            data: Data bytes (up to 8 bytes), as a list of ints or bytes-like
+            extended: Use 29-bit extended ID
+
+        Returns:
+            Response string.
+        """
+        # Set CAN ID format only when it differs from the last frame's
+        self._sync_state()
+        if self._can_mode != extended:
+            if extended:
+                # Set to 29-bit mode
+                self.connection.send_command('ATCP18')  # CAN Priority 18 (extended)
+            else:
+                # Set to 11-bit mode
+                self.connection.send_command('ATCP00')  # Standard 11-bit
+            self._can_mode = extended
 
         # Format data bytes
-        data_hex = ''.join([f'{b:02X}' for b in data])
+        if not isinstance(data, (bytes, bytearray)):
+            data = bytes(data)
+        data_hex = data.hex().upper()
 
         # Send frame
-        if extended:
-            cmd = f"{can_id:08X}{data_hex}"
-        else:
-            cmd = f"{can_id:03X}{data_hex}"
-
-        response = self.connection.send_command(cmd)
+        cmd = _format_can_id(can_id, extended) + data_hex
 
-        return 'OK' in response or response == ''
+        return self.connection.send_command(cmd)
 
     def receive_can_frame(self, timeout: float = 1.0) -> Optional[CANFrame]:
         """
@@ -112,6 +191,26 @@ class CANProtocol:
         Returns:
             List of captured CAN frames.
         """
+        response = self._capture(duration)
+
+        if not response:
+            return []
+
+        # Parse frames
+        frames = self._parse_can_frames(response)
+
+        return frames
+
+    def _capture(self, duration: float) -> str:
+        """
+        Run the adapter's monitor mode for a duration.
+
+        Args:
+            duration: Duration in seconds
+
+        Returns:
+            Raw monitor output, or an empty string if nothing was seen.
+        """
         # Enable CAN monitoring mode
         response = self.connection.send_command('ATMA', delay=duration)
 
@@ -119,12 +218,9 @@ class CANProtocol:
         self.connection.send_command('')
 
         if not response or 'NO DATA' in response:
-            return []
+            return ''
 
-        # Parse frames
-        frames = self._parse_can_frames(response)
-
-        return frames
+        return response
 
     def set_can_filter(self, can_id: int, extended: bool = False) -> bool:
         """
@@ -137,13 +233,14 @@ class CANProtocol:
         Returns:
             True if successful.
         """
-        if extended:
-            cmd = f'ATCF{can_id:08X}'
-        else:
-            cmd = f'ATCF{can_id:03X}'
+        self._sync_state()
+        cmd = 'ATCF' + _format_can_id(can_id, extended)
+        if cmd == self._can_filter:
+            return True
 
-        response = self.connection.send_command(cmd)
-        return 'OK' in response
+        ok = self.connection.send_command_ok(cmd)
+        self._can_filter = cmd if ok else None
+        return ok
 
     def set_can_mask(self, mask: int, extended: bool = False) -> bool:
         """
@@ -156,13 +253,14 @@ class CANProtocol:
         Returns:
             True if successful.
         """
-        if extended:
-            cmd = f'ATCM{mask:08X}'
-        else:
-            cmd = f'ATCM{mask:03X}'
+        self._sync_state()
+        cmd = 'ATCM' + _format_can_id(mask, extended)
+        if cmd == self._can_mask:
+            return True
 
-        response = self.connection.send_command(cmd)
-        return 'OK' in response
+        ok = self.connection.send_command_ok(cmd)
+        self._can_mask = cmd if ok else None
+        return ok
 
     def clear_can_filter(self) -> bool:
         """
@@ -171,10 +269,23 @@ class CANProtocol:
         Returns:
             True if successful.
         """
-        # Set filter and mask to 0 to receive all
-        self.set_can_filter(0)
-        self.set_can_mask(0)
-        return True
+        # Set filter and mask to 0 to receive all, sending only the values
+        # that differ from what the adapter already has
+        self._sync_state()
+        pending = [(attr, cmd) for attr, cmd in (
+                       ('_can_filter', 'ATCF' + _format_can_id(0, False)),
+                       ('_can_mask', 'ATCM' + _format_can_id(0, False)))
+                   if getattr(self, attr) != cmd]
+        if not pending:
+            return True
+
+        responses = self.connection.send_commands([cmd for _, cmd in pending])
+        ok = True
+        for (attr, cmd), response in zip(pending, responses):
+            acked = 'OK' in response
+            setattr(self, attr, cmd if acked else None)
+            ok = ok and acked
+        return ok
 
     def send_uds_request(self, service: int, data: List[int], ecu_id: int = 0x7DF) -> str:
         """
@@ -188,21 +299,16 @@ class CANProtocol:
         Returns:
             Response string.
         """
-        # Build UDS frame
-        frame_data = [len(data) + 1, service] + data
-
-        # Pad to 8 bytes
-        while len(frame_data) < 8:
-            frame_data.append(0x00)
-
-        # Send frame
-        self.send_can_frame(ecu_id, frame_data, extended=False)
+        # Build UDS frame in a zero-padded 8-byte buffer
+        frame_data = bytearray(8)
+        frame_data[0] = len(data) + 1
+        frame_data[1] = service
+        frame_data[2:2 + len(data)] = bytes(data)
 
-        # Receive response
-        # UDS response is typically on ID 0x7E8-0x7EF
-        response = self.connection.send_command('', delay=0.5)
-
-        return response
+        # Send frame; the reply (typically on ID 0x7E8-0x7EF) comes back as
+        # the response to the frame itself. An empty follow-up command would
+        # make the ELM327 repeat the request instead.
+        return self._send_and_wait(ecu_id, frame_data, extended=False)
 
     def _parse_can_frames(self, response: str) -> List[CANFrame]:
         """
@@ -215,51 +321,57 @@ class CANProtocol:
             List of parsed CAN frames.
         """
         frames = []
-        lines = response.split('\n')
-
-        for line in lines:
-            line = line.strip()
 
-            if not line or line == 'SEARCHING...' or line == 'STOPPED':
+        for match in _FRAME_LINE.finditer(response):
+            # Remove spaces
+            line = match.group().translate(_WS_TBL)
+
+            # The ID has 3 hex digits (11-bit) or 8 (29-bit) and is followed
+            # by whole data bytes, so the line length's parity tells them apart
+            n = len(line)
+            if n % 2 == 0 and n >= 10:
+                id_len = 8
+                extended = True
+            elif n % 2 == 1 and n >= 5:
+                id_len = 3
+                extended = False
+            else:
                 continue
 
-            try:
-                # Remove spaces
-                line = line.replace(' ', '').upper()
-
-                # Check for extended or standard ID
-                # Standard: 3 hex digits (11-bit)
-                # Extended: 8 hex digits (29-bit)
-
-                if len(line) >= 11:  # Minimum: 3-digit ID + 8-digit data (4 bytes)
-                    # Try to parse as standard frame
-                    can_id = int(line[0:3], 16)
-                    data_hex = line[3:]
-                    extended = False
-                elif len(line) >= 16:  # Extended: 8-digit ID + data
-                    can_id = int(line[0:8], 16)
-                    data_hex = line[8:]
-                    extended = True
-                else:
-                    continue
-
-                # Parse data bytes
-                data = []
-                for i in range(0, len(data_hex), 2):
-                    if i + 1 < len(data_hex):
-                        byte_val = int(data_hex[i:i+2], 16)
-                        data.append(byte_val)
-
-                if data:
-                    frame = CANFrame(can_id, data, extended)
-                    frames.append(frame)
-
-            except ValueError:
-                # Skip invalid frames
-                continue
+            can_id = int(line[:id_len], 16)
+            data = list(bytes.fromhex(line[id_len:]))
+            frames.append(CANFrame(can_id, data, extended))
 
         return frames
 
+    def _parse_can_ids(self, response: str) -> List[int]:
+        """
+        Collect the distinct CAN IDs seen in a monitoring response.
+
+        Cheaper than _parse_can_frames when only the IDs are needed, as no
+        frame objects or data lists are built.
+
+        Args:
+            response: Raw response from ATMA command
+
+        Returns:
+            Unique CAN IDs in order of first appearance.
+        """
+        # Dict keys keep first-seen order while discarding repeats
+        ids = {}
+
+        for match in _FRAME_LINE.finditer(response):
+            line = match.group().translate(_WS_TBL)
+
+            # Same length-parity rule as _parse_can_frames
+            n = len(line)
+            if n % 2 == 0 and n >= 10:
+                ids[int(line[:8], 16)] = None
+            elif n % 2 == 1 and n >= 5:
+                ids[int(line[:3], 16)] = None
+
+        return list(ids)
+
     def detect_ecus(self) -> List[int]:
         """
         Detect available ECUs on CAN bus using functional addressing.
@@ -267,20 +379,16 @@ class CANProtocol:
         Returns:
             List of ECU CAN IDs.
         """
-        ecus = []
-
         # Common ECU addresses (response IDs)
         common_ecu_ids = [0x7E8, 0x7E9, 0x7EA, 0x7EB, 0x7EC, 0x7ED, 0x7EE, 0x7EF]
 
         # Send broadcast request (UDS service 0x3E - Tester Present)
         self.send_can_frame(0x7DF, [0x02, 0x3E, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00])
 
-        # Monitor for responses
-        frames = self.monitor_can_bus(duration=2.0)
+        # Monitor for responses; only the IDs are needed
+        seen_ids = self._parse_can_ids(self._capture(duration=2.0))
 
-        # Extract unique ECU IDs from responses
-        for frame in frames:
-            if frame.can_id in common_ecu_ids and frame.can_id not in ecus:
-                ecus.append(frame.can_id)
+        # Keep the ECU response IDs, in the order they were first seen
+        ecus = [can_id for can_id in seen_ids if can_id in common_ecu_ids]
 
         return ecus
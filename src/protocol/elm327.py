@@ -2,11 +2,138 @@
 ELM327 AT command interface and device initialization.
 """
 
-from typing import Optional, List
+import re
+from typing import Optional, List, Dict, Tuple, Sequence
 from communication.elm327_connection import ELM327Connection
 from communication.exceptions import ProtocolError, InvalidResponseError
 
 
+# Whitespace removed from responses before slicing them by position
+_WS_TBL = str.maketrans('', '', ' \t\r\n')
+
+# PIDs whose responses are bitmaps of the next 32 supported PIDs
+_BITMAP_PIDS = (0x00, 0x20, 0x40, 0x60, 0x80, 0xA0, 0xC0, 0xE0)
+
+# Offsets (0-7, MSB first) of the bits set in each byte value
+_BITS = tuple(tuple(i for i in range(8) if b & (1 << (7 - i))) for b in range(256))
+
+# Most PIDs one mode 01 request may carry (SAE J1979, CAN protocols)
+MAX_PIDS_PER_REQUEST = 6
+
+# Frame index the adapter puts before each line of a multi-frame CAN response
+_FRAME_INDEX = re.compile(r'[0-9A-F]:')
+
+# Uppercase hex digits only
+_HEX_DIGITS = re.compile(r'[0-9A-F]+')
+
+# Voltage reading in an ATRV response, e.g. "12.5V"
+_VOLTAGE = re.compile(r'(\d+(?:\.\d*)?)\s*V')
+
+# (base PID, command, response header) for each bitmap PID, keyed by mode
+_BITMAP_QUERIES: Dict[str, Tuple[Tuple[int, str, str], ...]] = {}
+
+
+def _bitmap_queries(mode: str) -> Tuple[Tuple[int, str, str], ...]:
+    """
+    Get the supported-PID bitmap queries for a mode, building them once.
+
+    Args:
+        mode: OBD mode (e.g., '01')
+
+    Returns:
+        Tuple of (base PID, command, expected response header).
+    """
+    queries = _BITMAP_QUERIES.get(mode)
+    if queries is None:
+        response_mode = f'{int(mode, 16) + 0x40:02X}'
+        queries = tuple(
+            (base_pid, f'{mode}{base_pid:02X}', f'{response_mode}{base_pid:02X}')
+            for base_pid in _BITMAP_PIDS
+        )
+        _BITMAP_QUERIES[mode] = queries
+    return queries
+
+
+def _expand_bitmap(base_pid: int, bitmap: bytes) -> List[int]:
+    """
+    List the PIDs flagged in a 32-bit supported-PID bitmap.
+
+    Args:
+        base_pid: PID the bitmap was read from (0x00, 0x20, ...)
+        bitmap: The 4 bitmap bytes; the MSB of the first byte is PID base+1,
+            the LSB of the last byte is PID base+32
+
+    Returns:
+        Supported PID numbers in ascending order.
+    """
+    supported = []
+    for byte_idx, byte_val in enumerate(bitmap):
+        first = base_pid + byte_idx * 8 + 1
+        supported.extend(first + i for i in _BITS[byte_val] if first + i <= 0xFF)
+    return supported
+
+
+def join_frames(response: str) -> str:
+    """
+    Join a (possibly multi-frame) response into one hex string.
+
+    Multi-frame CAN responses start with a byte count line followed by
+    lines prefixed with a frame index ("0:", "1:", ...). The count is used
+    to drop the padding at the end of the last frame.
+
+    Args:
+        response: Response from the adapter
+
+    Returns:
+        Hex digits of the response payload.
+    """
+    parts = []
+    byte_count = None
+
+    for line in response.upper().split('\n'):
+        line = line.translate(_WS_TBL)
+        if _FRAME_INDEX.match(line):
+            parts.append(line[2:])
+        elif len(line) == 3 and _HEX_DIGITS.fullmatch(line):
+            byte_count = int(line, 16)
+        elif _HEX_DIGITS.fullmatch(line):
+            parts.append(line)
+
+    data = ''.join(parts)
+    if byte_count is not None:
+        data = data[:byte_count * 2]
+    return data
+
+
+def _parse_bitmaps(data: str, response_mode: str,
+                   pids: Sequence[int]) -> Optional[Dict[int, bytes]]:
+    """
+    Parse a multi-PID bitmap response ("41 00 xxxxxxxx 20 xxxxxxxx ...").
+
+    Args:
+        data: Response payload as hex digits
+        response_mode: Expected response mode byte (e.g., '41')
+        pids: Bitmap PIDs that were requested
+
+    Returns:
+        Bitmap bytes for each PID in the response, or None if the response
+        is not a well-formed answer to the request.
+    """
+    if not data.startswith(response_mode) or not _HEX_DIGITS.fullmatch(data):
+        return None
+
+    # Records are a PID byte followed by 4 bitmap bytes
+    raw = bytes.fromhex(data[2:len(data) & ~1])
+    bitmaps = {}
+    for pos in range(0, len(raw) - 4, 5):
+        pid = raw[pos]
+        if pid not in pids or pid in bitmaps:
+            return None
+        bitmaps[pid] = raw[pos + 1:pos + 5]
+
+    return bitmaps or None
+
+
 class ELM327:
     """ELM327 command interface for AT commands and device control."""
 
@@ -39,8 +166,33 @@ class ELM327:
         self.protocol: Optional[str] = None
         self.voltage: Optional[float] = None
 
+        # Adapter answers that only change when the protocol is set or the
+        # adapter is reset; valid while the connection's state_generation
+        # stays the same
+        self._protocol_desc: Optional[str] = None
+        self._protocol_num: Optional[str] = None
+        self._state_gen = connection.state_generation
+
+    def reset_state(self):
+        """
+        Forget the cached version and protocol answers.
+
+        Resets and protocol changes sent on the connection, by this class or
+        any other caller, are picked up automatically.
+        """
+        self.version = None
+        self._protocol_desc = None
+        self._protocol_num = None
+        self._state_gen = self.connection.state_generation
+
+    def _sync_state(self):
+        """Drop the cached answers if the adapter was reset since they were read."""
+        if self._state_gen != self.connection.state_generation:
+            self.reset_state()
+
     def initialize(self, protocol: str = '0', echo: bool = False,
-                   headers: bool = False, spaces: bool = True) -> bool:
+                   headers: bool = False, spaces: bool = True,
+                   adaptive_timing: int = 1) -> bool:
         """
         Initialize ELM327 adapter with standard settings.
 
@@ -49,6 +201,7 @@ class ELM327:
             echo: Enable command echo
             headers: Show headers in responses
             spaces: Add spaces between bytes
+            adaptive_timing: ATAT mode (0=off, 1=auto1, 2=auto2)
 
         Returns:
             True if initialization successful.
@@ -77,6 +230,9 @@ class ELM327:
             # Configure spaces
             self.set_spaces(spaces)
 
+            # Let the adapter shorten its response wait to the ECU's pace
+            self.set_adaptive_timing(adaptive_timing)
+
             # Read voltage to test communication
             self.voltage = self.get_voltage()
 
@@ -96,6 +252,7 @@ class ELM327:
             Device identification string.
         """
         response = self.connection.send_command('ATZ', delay=1.5)
+        self.reset_state()
         return response
 
     def get_version(self) -> str:
@@ -105,6 +262,10 @@ class ELM327:
         Returns:
             Version string.
         """
+        self._sync_state()
+        if self.version is not None:
+            return self.version
+
         response = self.connection.send_command('ATI')
         self.version = response
         return response
@@ -120,8 +281,7 @@ class ELM327:
             True if successful.
         """
         cmd = 'ATE1' if enabled else 'ATE0'
-        response = self.connection.send_command(cmd)
-        return 'OK' in response
+        return self.connection.send_command_ok(cmd)
 
     def set_protocol(self, protocol: str) -> bool:
         """
@@ -133,9 +293,15 @@ class ELM327:
         Returns:
             True if successful.
         """
+        self._sync_state()
         cmd = f'ATSP{protocol}'
-        response = self.connection.send_command(cmd)
-        return 'OK' in response
+        ok = self.connection.send_command_ok(cmd)
+
+        # Only the protocol answers change; the version stays valid
+        self._protocol_desc = None
+        self._protocol_num = None
+        self._state_gen = self.connection.state_generation
+        return ok
 
     def set_auto_protocol(self) -> bool:
         """
@@ -153,7 +319,15 @@ class ELM327:
         Returns:
             Protocol description string.
         """
+        self._sync_state()
+        if self._protocol_desc is not None:
+            return self._protocol_desc
+
         response = self.connection.send_command('ATDP')
+
+        # A bare "AUTO" changes once the search finds the protocol
+        if response and response != 'AUTO':
+            self._protocol_desc = response
         return response
 
     def describe_protocol_number(self) -> str:
@@ -163,7 +337,15 @@ class ELM327:
         Returns:
             Protocol number.
         """
+        self._sync_state()
+        if self._protocol_num is not None:
+            return self._protocol_num
+
         response = self.connection.send_command('ATDPN')
+
+        # "0" / "A0" means automatic search has not found a protocol yet
+        if response and response not in ('0', 'A0'):
+            self._protocol_num = response
         return response
 
     def set_headers(self, enabled: bool) -> bool:
@@ -177,8 +359,7 @@ class ELM327:
             True if successful.
         """
         cmd = 'ATH1' if enabled else 'ATH0'
-        response = self.connection.send_command(cmd)
-        return 'OK' in response
+        return self.connection.send_command_ok(cmd)
 
     def set_spaces(self, enabled: bool) -> bool:
         """
@@ -191,8 +372,7 @@ class ELM327:
             True if successful.
         """
         cmd = 'ATS1' if enabled else 'ATS0'
-        response = self.connection.send_command(cmd)
-        return 'OK' in response
+        return self.connection.send_command_ok(cmd)
 
     def get_voltage(self) -> float:
         """
@@ -202,15 +382,16 @@ class ELM327:
             Voltage in volts.
         """
         response = self.connection.send_command('ATRV')
-        try:
-            # Response format: "12.5V"
-            voltage_str = response.replace('V', '').strip()
-            voltage = float(voltage_str)
-            self.voltage = voltage
-            return voltage
-        except ValueError:
+
+        # Response format: "12.5V"; searching also skips an echoed command
+        match = _VOLTAGE.search(response)
+        if match is None:
             raise InvalidResponseError(f"Invalid voltage response: {response}")
 
+        voltage = float(match.group(1))
+        self.voltage = voltage
+        return voltage
+
     def set_timeout(self, timeout_ms: int) -> bool:
         """
         Set timeout for OBD responses.
@@ -224,8 +405,7 @@ class ELM327:
         # Convert to hex value (timeout / 4ms)
         timeout_val = min(255, timeout_ms // 4)
         cmd = f'ATST{timeout_val:02X}'
-        response = self.connection.send_command(cmd)
-        return 'OK' in response
+        return self.connection.send_command_ok(cmd)
 
     def set_adaptive_timing(self, mode: int) -> bool:
         """
@@ -238,8 +418,7 @@ class ELM327:
             True if successful.
         """
         cmd = f'ATAT{mode}'
-        response = self.connection.send_command(cmd)
-        return 'OK' in response
+        return self.connection.send_command_ok(cmd)
 
     def close_protocol(self) -> bool:
         """
@@ -248,8 +427,9 @@ class ELM327:
         Returns:
             True if successful.
         """
-        response = self.connection.send_command('ATPC')
-        return 'OK' in response
+        self._protocol_desc = None
+        self._protocol_num = None
+        return self.connection.send_command_ok('ATPC')
 
     def warm_start(self) -> str:
         """
@@ -259,6 +439,7 @@ class ELM327:
             Device response.
         """
         response = self.connection.send_command('ATWS', delay=1.0)
+        self.reset_state()
         return response
 
     def set_can_filter(self, filter_id: int) -> bool:
@@ -272,8 +453,7 @@ class ELM327:
             True if successful.
         """
         cmd = f'ATCF{filter_id:03X}'
-        response = self.connection.send_command(cmd)
-        return 'OK' in response
+        return self.connection.send_command_ok(cmd)
 
     def set_can_mask(self, mask: int) -> bool:
         """
@@ -286,8 +466,7 @@ class ELM327:
             True if successful.
         """
         cmd = f'ATCM{mask:03X}'
-        response = self.connection.send_command(cmd)
-        return 'OK' in response
+        return self.connection.send_command_ok(cmd)
 
     def get_supported_pids(self, mode: str = '01') -> List[int]:
         """
@@ -299,30 +478,43 @@ class ELM327:
         Returns:
             List of supported PID numbers.
         """
+        # Ask for several bitmaps per request where the protocol allows it,
+        # falling back to one request per bitmap PID
+        if mode == '01':
+            supported = self._get_supported_pids_batched(mode)
+            if supported is not None:
+                return supported
+
         supported = []
 
         # PIDs 00, 20, 40, 60, 80, A0, C0, E0 return bitmaps of supported PIDs
-        for base_pid in [0x00, 0x20, 0x40, 0x60, 0x80, 0xA0, 0xC0, 0xE0]:
-            cmd = f'{mode}{base_pid:02X}'
+        for base_pid, cmd, header in _bitmap_queries(mode):
             try:
                 response = self.connection.send_command(cmd)
 
                 # Parse response
-                # Format: "41 00 BE 1F A8 13" (mode+PID followed by 4 data bytes)
-                parts = response.replace(mode, '').replace(f'{base_pid:02X}', '').strip().split()
-
-                if len(parts) >= 4:
-                    # Each byte represents 8 PIDs
-                    for byte_idx, byte_str in enumerate(parts[:4]):
-                        try:
-                            byte_val = int(byte_str, 16)
-                            for bit in range(8):
-                                if byte_val & (1 << (7 - bit)):
-                                    pid_num = base_pid + (byte_idx * 8) + bit + 1
-                                    if pid_num <= 0xFF:
-                                        supported.append(pid_num)
-                        except ValueError:
-                            continue
+                # Format: "41 00 BE 1F A8 13" (mode+PID followed by 4 data bytes);
+                # the 4 bytes are sliced after the header rather than found by
+                # removing substrings that may also occur in the data
+                data = response.translate(_WS_TBL).upper()
+                start = data.find(header)
+                if start < 0:
+                    continue
+
+                bitmap_hex = data[start + 4:start + 12]
+                if len(bitmap_hex) < 8:
+                    continue
+
+                try:
+                    bitmap = bytes.fromhex(bitmap_hex)
+                except ValueError:
+                    continue
+
+                supported.extend(_expand_bitmap(base_pid, bitmap))
+
+                # The lowest bit flags the next bitmap PID; stop when clear
+                if not bitmap[-1] & 1:
+                    break
 
             except Exception:
                 # If query fails, stop checking
@@ -330,6 +522,65 @@ class ELM327:
 
         return supported
 
+    def _get_supported_pids_batched(self, mode: str) -> Optional[List[int]]:
+        """
+        Read the supported-PID bitmaps with multi-PID requests.
+
+        Up to MAX_PIDS_PER_REQUEST bitmap PIDs are sent per request
+        (e.g., "0100204060 80A0"), so all eight take two round-trips.
+        Bitmaps flagged by their predecessor but missing from a reply are
+        then queried one at a time.
+
+        Args:
+            mode: OBD mode
+
+        Returns:
+            List of supported PID numbers, or None if the adapter or
+            protocol does not answer multi-PID requests.
+        """
+        response_mode = f'{int(mode, 16) + 0x40:02X}'
+        bitmaps: Dict[int, bytes] = {}
+
+        try:
+            for start in range(0, len(_BITMAP_PIDS), MAX_PIDS_PER_REQUEST):
+                # The lowest bit of a bitmap flags the next bitmap PID, so a
+                # further batch is only sent if the last one says it exists
+                previous = _BITMAP_PIDS[start - 1] if start else None
+                if previous is not None and not bitmaps.get(previous, b'\0')[-1] & 1:
+                    break
+
+                pids = _BITMAP_PIDS[start:start + MAX_PIDS_PER_REQUEST]
+                cmd = mode + ''.join(f'{pid:02X}' for pid in pids)
+                response = self.connection.send_command(cmd)
+
+                parsed = _parse_bitmaps(join_frames(response), response_mode, pids)
+                if parsed is None:
+                    return None
+                bitmaps.update(parsed)
+
+        except Exception:
+            return None
+
+        # Non-CAN ECUs may answer only the first PID of a request, so walk the
+        # low-bit chain and ask for any flagged bitmap left out of a reply
+        supported = []
+        for base_pid, cmd, _ in _bitmap_queries(mode):
+            bitmap = bitmaps.get(base_pid)
+            if bitmap is None:
+                try:
+                    response = self.connection.send_command(cmd)
+                except Exception:
+                    break
+                parsed = _parse_bitmaps(join_frames(response), response_mode, (base_pid,))
+                if parsed is None:
+                    break
+                bitmap = parsed[base_pid]
+
+            supported.extend(_expand_bitmap(base_pid, bitmap))
+            if not bitmap[-1] & 1:
+                break
+        return supported
+
     def send_raw_command(self, command: str, delay: float = 0.1) -> str:
         """
         Send raw command to adapter.
@@ -2,12 +2,34 @@
 OBD-II protocol implementation for modes 01-09.
 """
 
+import re
 from typing import List, Dict, Any, Optional, Tuple
 from communication.elm327_connection import ELM327Connection
 from communication.exceptions import InvalidResponseError, TimeoutError
+from protocol.elm327 import ELM327, MAX_PIDS_PER_REQUEST, join_frames
 from protocol.pid_decoder import PIDDecoder
 
 
+# Uppercase hex digits only; other lines (e.g. 'SEARCHING...') carry no data
+_HEX_LINE = re.compile(r'[0-9A-F]*')
+
+# Whitespace removed from response lines in a single translate pass
+_WS_TBL = str.maketrans('', '', ' \t\r\n')
+
+# Mode 03/07 response prefix at the start of a line
+_DTC_PREFIX = re.compile(r'^4[37]')
+
+# DTC system letter, indexed by the top two bits of the first byte
+_DTC_LETTERS = 'PCBU'
+
+# First three DTC characters for every value of the first byte: the system
+# letter, the 2-bit first digit and the low nibble as the second digit
+_DTC_HEAD = tuple(f"{_DTC_LETTERS[b >> 6]}{(b >> 4) & 0x03}{b & 0x0F:X}" for b in range(256))
+
+# Bytes outside printable ASCII, removed from VIN data
+_NON_PRINTABLE = bytes(b for b in range(256) if not 32 <= b <= 126)
+
+
 class OBD2Protocol:
     """OBD-II protocol handler for standard modes."""
 
@@ -32,6 +54,14 @@ class OBD2Protocol:
         self.connection = connection
         self.decoder = PIDDecoder()
 
+        # Adapter-level handler on the same connection, used for the
+        # supported-PID bitmap walk
+        self._elm327 = ELM327(connection)
+
+        # Cleared once the vehicle answers a multi-PID request unusably, so
+        # later queries go straight to one PID per request
+        self._multi_pid_ok = True
+
     def query_pid(self, mode: str, pid: int) -> Any:
         """
         Query a specific PID.
@@ -57,10 +87,20 @@ class OBD2Protocol:
         if not response or response in ['NO DATA', 'UNABLE TO CONNECT', 'ERROR']:
             raise InvalidResponseError(f"Invalid response: {response}")
 
-        # Decode response
+        # Take the data bytes straight from the line answering this PID and
+        # hand them to the PID's decoder
+        mode_num = int(mode, 16)
+        header = f"{mode_num + 0x40:02X}{pid:02X}"
+        for line in response.upper().split('\n'):
+            line = line.translate(_WS_TBL)
+            if line.startswith(header) and _HEX_LINE.fullmatch(line):
+                break
+        else:
+            raise InvalidResponseError(f"Failed to decode response '{response}': no {header} reply")
+
         try:
-            _, _, value = self.decoder.decode_response_string(response)
-            return value
+            data_bytes = list(bytes.fromhex(line[4:len(line) & ~1]))
+            return self.decoder.decode_response(mode_num, pid, data_bytes)
         except Exception as e:
             raise InvalidResponseError(f"Failed to decode response '{response}': {str(e)}")
 
@@ -81,7 +121,11 @@ class OBD2Protocol:
 
     def query_multiple_pids(self, mode: str, pids: List[int]) -> Dict[int, Any]:
         """
-        Query multiple PIDs sequentially.
+        Query multiple PIDs, several per request where possible.
+
+        Mode 01 PIDs with a known response length are sent up to
+        MAX_PIDS_PER_REQUEST at a time; any PID missing from a batched
+        answer is retried on its own.
 
         Args:
             mode: OBD mode
@@ -91,8 +135,25 @@ class OBD2Protocol:
             Dictionary mapping PID number to decoded value.
         """
         results = {}
+        pending = pids
+
+        if mode == self.MODE_CURRENT_DATA and self._multi_pid_ok:
+            sizes = {}
+            for pid in pids:
+                pid_def = self.decoder.get_pid_info(1, pid)
+                if pid_def is not None:
+                    sizes[pid] = pid_def.num_bytes
 
-        for pid in pids:
+            batchable = list(sizes)
+            for start in range(0, len(batchable), MAX_PIDS_PER_REQUEST):
+                if not self._multi_pid_ok:
+                    break
+                results.update(self._query_pid_batch(
+                    batchable[start:start + MAX_PIDS_PER_REQUEST], sizes))
+
+            pending = [pid for pid in pids if pid not in results]
+
+        for pid in pending:
             try:
                 value = self.query_pid(mode, pid)
                 results[pid] = value
@@ -102,6 +163,60 @@ class OBD2Protocol:
 
         return results
 
+    def _query_pid_batch(self, pids: List[int], sizes: Dict[int, int]) -> Dict[int, Any]:
+        """
+        Query several mode 01 PIDs with a single request.
+
+        Args:
+            pids: PID numbers (at most MAX_PIDS_PER_REQUEST)
+            sizes: Number of data bytes in each PID's response
+
+        Returns:
+            Dictionary mapping PID number to decoded value for the PIDs the
+            vehicle answered. Empty if the response could not be split, in
+            which case batching is disabled for this connection.
+        """
+        if len(pids) < 2:
+            return {}
+
+        cmd = self.MODE_CURRENT_DATA + ''.join(f'{pid:02X}' for pid in pids)
+        try:
+            response = self.connection.send_command(cmd)
+        except (InvalidResponseError, TimeoutError):
+            return {}
+
+        if not response or 'NO DATA' in response:
+            return {}
+
+        data = join_frames(response)
+        if not data.startswith('41'):
+            self._multi_pid_ok = False
+            return {}
+
+        try:
+            raw = bytes.fromhex(data[2:])
+        except ValueError:
+            self._multi_pid_ok = False
+            return {}
+
+        # Walk the "PID, data bytes" records; anything unexpected means the
+        # adapter or vehicle does not support multi-PID requests
+        values = {}
+        pos = 0
+        while pos < len(raw):
+            pid = raw[pos]
+            size = sizes.get(pid)
+            if pid not in pids or pid in values or pos + 1 + size > len(raw):
+                self._multi_pid_ok = False
+                return {}
+            try:
+                values[pid] = self.decoder.decode_response(1, pid, list(raw[pos + 1:pos + 1 + size]))
+            except Exception:
+                pass
+            pos += 1 + size
+
+        return values
+
     def get_current_data(self, pid: int) -> Any:
         """
         Get current data (Mode 01).
@@ -196,25 +311,25 @@ class OBD2Protocol:
 
             # VIN response is multi-line, need to concatenate
             # Remove mode and PID bytes, extract ASCII
-            vin_bytes = []
+            vin_bytes = bytearray()
 
-            lines = response.split('\n')
-            for line in lines:
-                # Remove spaces
-                line = line.replace(' ', '').upper()
+            for line in response.upper().split('\n'):
+                # Remove whitespace
+                line = line.translate(_WS_TBL)
+
+                # Status text such as SEARCHING... carries no VIN bytes
+                if not _HEX_LINE.fullmatch(line):
+                    continue
 
                 # Skip mode/PID header
                 if line.startswith('4902'):
                     line = line[4:]
 
-                # Parse hex bytes and convert to ASCII
-                for i in range(0, len(line), 2):
-                    if i + 1 < len(line):
-                        byte_val = int(line[i:i+2], 16)
-                        if 32 <= byte_val <= 126:  # Printable ASCII
-                            vin_bytes.append(chr(byte_val))
+                # Parse hex bytes (a trailing odd nibble is ignored)
+                vin_bytes += bytes.fromhex(line[:len(line) & ~1])
 
-            vin = ''.join(vin_bytes).strip()
+            # Keep printable ASCII only
+            vin = vin_bytes.translate(None, _NON_PRINTABLE).decode('ascii').strip()
 
             if len(vin) == 17:  # Valid VIN length
                 return vin
@@ -236,44 +351,26 @@ class OBD2Protocol:
         """
         dtcs = []
 
-        # Remove mode response prefix (43 or 47)
-        response = response.replace('43', '').replace('47', '').strip()
+        # Strip whitespace and the mode response prefix (43 or 47) from each
+        # line; only the prefix is removed, never matching digits in the data
+        hex_lines = []
+        for line in response.upper().split('\n'):
+            line = _DTC_PREFIX.sub('', line.translate(_WS_TBL))
+            if _HEX_LINE.fullmatch(line):
+                hex_lines.append(line)
 
-        # Remove spaces
-        response = response.replace(' ', '').upper()
+        # Decode all lines in one pass, dropping any incomplete trailing code
+        hex_data = ''.join(hex_lines)
+        raw = bytes.fromhex(hex_data[:len(hex_data) & ~3])
 
         # DTCs are encoded as 2-byte pairs
-        # First byte: first two characters
-        # Second byte: last two characters
-        for i in range(0, len(response), 4):
-            if i + 3 < len(response):
-                try:
-                    byte1 = int(response[i:i+2], 16)
-                    byte2 = int(response[i+2:i+4], 16)
-
-                    # Skip if both bytes are 0 (padding)
-                    if byte1 == 0 and byte2 == 0:
-                        continue
-
-                    # First 2 bits of byte1 determine letter
-                    letter_map = {0: 'P', 1: 'C', 2: 'B', 3: 'U'}
-                    letter = letter_map[(byte1 >> 6) & 0x03]
-
-                    # Next 2 bits are first digit
-                    digit1 = (byte1 >> 4) & 0x03
-
-                    # Last 4 bits of byte1 are second digit
-                    digit2 = byte1 & 0x0F
-
-                    # Byte2 contains last two digits
-                    digit3 = (byte2 >> 4) & 0x0F
-                    digit4 = byte2 & 0x0F
-
-                    dtc = f"{letter}{digit1}{digit2:X}{digit3:X}{digit4:X}"
-                    dtcs.append(dtc)
+        for byte1, byte2 in zip(raw[0::2], raw[1::2]):
+            # Skip if both bytes are 0 (padding)
+            if byte1 == 0 and byte2 == 0:
+                continue
 
-                except ValueError:
-                    continue
+            # Byte1 gives the letter and first two digits, byte2 the last two
+            dtcs.append(f"{_DTC_HEAD[byte1]}{byte2:02X}")
 
         return dtcs
 
@@ -287,27 +384,6 @@ class OBD2Protocol:
         Returns:
             List of supported PID numbers.
         """
-        supported = []
-
-        # PIDs 00, 20, 40, 60, 80, A0, C0, E0 return bitmaps
-        for base_pid in [0x00, 0x20, 0x40, 0x60, 0x80, 0xA0, 0xC0, 0xE0]:
-            try:
-                response = self.query_pid_raw(mode, base_pid)
-
-                # Parse response to get bitmap
-                _, _, data_bytes = self.decoder.parse_response_bytes(response)
-
-                if len(data_bytes) >= 4:
-                    # Each byte represents 8 PIDs
-                    for byte_idx, byte_val in enumerate(data_bytes[:4]):
-                        for bit in range(8):
-                            if byte_val & (1 << (7 - bit)):
-                                pid_num = base_pid + (byte_idx * 8) + bit + 1
-                                if pid_num <= 0xFF:
-                                    supported.append(pid_num)
-
-            except Exception:
-                # Stop on first failure
-                break
-
-        return supported
+        # Shares the adapter-level implementation, which batches the bitmap
+        # queries into multi-PID requests when the protocol supports them
+        return self._elm327.get_supported_pids(mode)
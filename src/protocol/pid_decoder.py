@@ -2,10 +2,28 @@
 PID value decoder for OBD-II responses.
 """
 
-from typing import List, Any, Optional, Tuple
+from functools import lru_cache
+from typing import Any, Callable, List, Optional, Sequence, Tuple
 from data.pid_definitions import STANDARD_PIDS, PIDDefinition
 
 
+# Drops blanks and the prompt and uppercases hex digits in a single pass
+_CLEAN_TBL = str.maketrans({**{c: c.upper() for c in 'abcdef'},
+                            **{c: None for c in ' \t\r\n>'}})
+
+# Mode 01 definition for each PID number (None where undefined); indexing a
+# dense tuple skips the hash and the read-only proxy of STANDARD_PIDS
+_PID_TABLE = tuple(STANDARD_PIDS.get(pid) for pid in range(256))
+
+# Decoder for each PID number, so bulk decoding indexes a dense table too
+_STANDARD_DECODERS = tuple(
+    pid_def.decoder if pid_def is not None else None for pid_def in _PID_TABLE
+)
+
+# Distinct response strings remembered by decode_response_string
+DECODE_CACHE_SIZE = 512
+
+
 class PIDDecoder:
     """Decoder for OBD-II PID values."""
 
@@ -13,6 +31,22 @@ class PIDDecoder:
         """Initialize PID decoder."""
         self.custom_pids = {}
 
+        # (mode, pid) -> definition or None, resolved once per key; cleared
+        # when a custom PID is registered. Custom PIDs may be wider than a
+        # byte (e.g. mode 22 DIDs), so the pair is not packed into one int
+        self._resolved = {}
+
+        # Steady-state polling repeats identical responses, so whole decoded
+        # strings are memoized per decoder instance
+        self._decode_cached = lru_cache(maxsize=DECODE_CACHE_SIZE)(self._decode_string)
+
+        # (mode, pid) -> unit suffix (" km/h", or "" without a unit), or
+        # None for PIDs without a definition; cleared with _resolved
+        self._formats = {}
+
+        # Mode 01 decoders by PID with custom PIDs applied, built on first use
+        self._mode1_decoders: Optional[List[Optional[Callable]]] = None
+
     def decode_response(self, mode: int, pid: int, data_bytes: List[int]) -> Any:
         """
         Decode PID response data.
@@ -25,19 +59,49 @@ class PIDDecoder:
         Returns:
             Decoded value.
         """
-        # Check custom PIDs first
-        key = (mode, pid)
-        if key in self.custom_pids:
-            pid_def = self.custom_pids[key]
-            return pid_def.decoder(data_bytes)
-
-        # Check standard PIDs (Mode 01)
-        if mode == 1 and pid in STANDARD_PIDS:
-            pid_def = STANDARD_PIDS[pid]
+        # Resolved definitions are read straight from the memo; only the
+        # first decode of a mode/PID pays for the get_pid_info call
+        try:
+            pid_def = self._resolved[(mode, pid)]
+        except KeyError:
+            pid_def = self.get_pid_info(mode, pid)
+
+        if pid_def is not None:
             return pid_def.decoder(data_bytes)
 
         # Unknown PID, return raw bytes as hex string
-        return ' '.join([f'{b:02X}' for b in data_bytes])
+        return bytes(data_bytes).hex(' ').upper()
+
+    def decode_batch(self, modes: Sequence[int], pids: Sequence[int],
+                     data_rows: Sequence[List[int]]) -> List[Any]:
+        """
+        Decode many already-split responses, e.g. when replaying a log.
+
+        Mode 01 rows are decoded through a 256-entry table indexed by PID;
+        other modes and unknown PIDs go through decode_response.
+
+        Args:
+            modes: OBD mode number of each row
+            pids: PID number of each row
+            data_rows: Data bytes of each row
+
+        Returns:
+            Decoded value of each row, in order.
+        """
+        table = self._mode1_decoders
+        if table is None:
+            table = list(_STANDARD_DECODERS)
+            for (mode, pid), pid_def in self.custom_pids.items():
+                if mode == 1 and 0 <= pid <= 0xFF:
+                    table[pid] = pid_def.decoder
+            self._mode1_decoders = table
+
+        decode = self.decode_response
+        values = []
+        for mode, pid, data in zip(modes, pids, data_rows):
+            fn = table[pid] if mode == 1 else None
+            values.append(fn(data) if fn is not None else decode(mode, pid, data))
+        return values
 
     def get_pid_info(self, mode: int, pid: int) -> Optional[PIDDefinition]:
         """
@@ -50,16 +114,19 @@ class PIDDecoder:
         Returns:
             PID definition or None if not found.
         """
-        # Check custom PIDs
         key = (mode, pid)
-        if key in self.custom_pids:
-            return self.custom_pids[key]
+        try:
+            return self._resolved[key]
+        except KeyError:
+            pass
 
-        # Check standard PIDs
-        if mode == 1 and pid in STANDARD_PIDS:
-            return STANDARD_PIDS[pid]
+        # Custom PIDs take precedence over standard (Mode 01) ones
+        pid_def = self.custom_pids.get((mode, pid))
+        if pid_def is None and mode == 1 and 0 <= pid <= 0xFF:
+            pid_def = _PID_TABLE[pid]
 
-        return None
+        self._resolved[key] = pid_def
+        return pid_def
 
     def register_custom_pid(self, mode: int, pid_def: PIDDefinition):
         """
@@ -71,6 +138,10 @@ class PIDDecoder:
         """
         key = (mode, pid_def.pid)
         self.custom_pids[key] = pid_def
+        self._resolved.clear()
+        self._formats.clear()
+        self._decode_cached.cache_clear()
+        self._mode1_decoders = None
 
     def parse_response_bytes(self, response: str) -> Tuple[int, int, List[int]]:
         """
@@ -85,33 +156,23 @@ class PIDDecoder:
         Raises:
             ValueError: If response format is invalid.
         """
-        # Remove spaces and convert to uppercase
-        response = response.replace(' ', '').upper()
-
-        # Remove common prefixes
-        response = response.replace('>', '').strip()
+        # Remove spaces and the prompt, convert to uppercase
+        response = response.translate(_CLEAN_TBL)
 
         # Minimum length is 4 characters (mode response + PID)
         if len(response) < 4:
             raise ValueError(f"Response too short: {response}")
 
-        # First byte is mode response (e.g., 41 for mode 01)
-        mode_response = int(response[0:2], 16)
-        mode = mode_response - 0x40  # Mode response is mode + 0x40
-
-        # Second byte is PID
-        pid = int(response[2:4], 16)
+        # An odd trailing digit is padded with 0
+        if len(response) % 2:
+            response += '0'
+        raw = bytes.fromhex(response)
 
-        # Remaining bytes are data
-        data_bytes = []
-        for i in range(4, len(response), 2):
-            if i + 1 < len(response):
-                byte_val = int(response[i:i+2], 16)
-                data_bytes.append(byte_val)
-            elif i < len(response):
-                # Odd number of hex digits, pad with 0
-                byte_val = int(response[i] + '0', 16)
-                data_bytes.append(byte_val)
+        # First byte is mode response (e.g., 41 for mode 01), second is PID,
+        # remaining bytes are data
+        mode = raw[0] - 0x40  # Mode response is mode + 0x40
+        pid = raw[1]
+        data_bytes = list(raw[2:])
 
         return mode, pid, data_bytes
 
@@ -125,6 +186,10 @@ class PIDDecoder:
         Returns:
             Tuple of (mode, pid, decoded_value)
         """
+        return self._decode_cached(response)
+
+    def _decode_string(self, response: str) -> Tuple[int, int, Any]:
+        """Uncached body of decode_response_string."""
         mode, pid, data_bytes = self.parse_response_bytes(response)
         value = self.decode_response(mode, pid, data_bytes)
         return mode, pid, value
@@ -141,12 +206,19 @@ class PIDDecoder:
         Returns:
             Formatted string with value and unit.
         """
-        pid_def = self.get_pid_info(mode, pid)
-
-        if pid_def is None:
+        key = (mode, pid)
+        try:
+            suffix = self._formats[key]
+        except KeyError:
+            # Build the unit suffix once per PID; it is appended, never used as
+            # a format string, since custom units may contain braces
+            pid_def = self.get_pid_info(mode, pid)
+            suffix = None if pid_def is None else f" {pid_def.unit}".rstrip()
+            self._formats[key] = suffix
+
+        if suffix is None:
             return str(value)
 
         if isinstance(value, float):
-            return f"{value:.2f} {pid_def.unit}".strip()
-        else:
-            return f"{value} {pid_def.unit}".strip()
+            return f"{value:.2f}{suffix}"
+        return f"{value}{suffix}"
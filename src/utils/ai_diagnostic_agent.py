@@ -3,9 +3,13 @@ AI-powered diagnostic agent for autonomous ELM327 troubleshooting.
 Uses Claude API (or compatible) to intelligently diagnose and fix connection issues.
 """
 
-import json
-from typing import Optional, Dict, Any, List, Callable
-from datetime import datetime
+from collections import deque
+from typing import Optional, Dict, Any, List, Callable, Deque
+from utils.helpers import format_local_time, json_dumps
+
+
+# Write buffer used when exporting the diagnostic log
+EXPORT_BUFFER_SIZE = 1 << 20
 
 
 class AIDiagnosticAgent:
@@ -13,6 +17,79 @@ class AIDiagnosticAgent:
     AI agent that can autonomously interact with ELM327 adapter to diagnose issues.
     """
 
+    # Maximum number of diagnostic log entries kept; older entries are dropped
+    LOG_CAP = 10_000
+
+    # Tools available to the AI; shared by all instances
+    TOOLS = (
+        {
+            "name": "send_command",
+            "description": "Send a command to the ELM327 adapter and receive response. Use this to send AT commands (like ATZ, ATSP3, etc.) or OBD-II commands (like 0100, 010C, etc.)",
+            "input_schema": {
+                "type": "object",
+                "properties": {
+                    "command": {
+                        "type": "string",
+                        "description": "The command to send (e.g., 'ATZ', 'ATSP3', '0100')"
+                    },
+                    "delay": {
+                        "type": "number",
+                        "description": "Optional delay in seconds after sending (default 0.1)",
+                        "default": 0.1
+                    }
+                },
+                "required": ["command"]
+            }
+        },
+        {
+            "name": "get_connection_status",
+            "description": "Check if currently connected to ELM327 adapter and get connection details",
+            "input_schema": {
+                "type": "object",
+                "properties": {}
+            }
+        },
+        {
+            "name": "get_protocol_info",
+            "description": "Get current protocol information from ELM327",
+            "input_schema": {
+                "type": "object",
+                "properties": {}
+            }
+        },
+        {
+            "name": "report_finding",
+            "description": "Report a diagnostic finding or recommendation to the user",
+            "input_schema": {
+                "type": "object",
+                "properties": {
+                    "severity": {
+                        "type": "string",
+                        "enum": ["info", "success", "warning", "error"],
+                        "description": "Severity level of the finding"
+                    },
+                    "message": {
+                        "type": "string",
+                        "description": "The finding or recommendation message"
+                    }
+                },
+                "required": ["severity", "message"]
+            }
+        }
+    )
+
+    # Example diagnostic sequence run by the mock session
+    _MOCK_STEPS = (
+        ("Checking connection status...", "get_connection_status", {}),
+        ("Getting adapter version...", "send_command", {"command": "ATI"}),
+        ("Reading voltage...", "send_command", {"command": "ATRV"}),
+        ("Checking current protocol...", "send_command", {"command": "ATDP"}),
+        ("Setting protocol to ISO 9141-2...", "send_command", {"command": "ATSP3"}),
+        ("Increasing timeout for K-line...", "send_command", {"command": "ATST FF"}),
+        ("Enabling headers...", "send_command", {"command": "ATH1"}),
+        ("Testing with supported PIDs query...", "send_command", {"command": "0100"}),
+    )
+
     def __init__(self, app, api_key: Optional[str] = None):
         """
         Initialize AI diagnostic agent.
@@ -24,66 +101,45 @@ class AIDiagnosticAgent:
         self.app = app
         self.api_key = api_key
         self.conversation_history: List[Dict] = []
-        self.diagnostic_log: List[Dict] = []
+        self.diagnostic_log: Deque[Dict] = deque(maxlen=self.LOG_CAP)
+        self._dropped = 0  # Entries pushed out of diagnostic_log this session
         self.running = False
 
-        # Tools available to the AI
-        self.tools = [
-            {
-                "name": "send_command",
-                "description": "Send a command to the ELM327 adapter and receive response. Use this to send AT commands (like ATZ, ATSP3, etc.) or OBD-II commands (like 0100, 010C, etc.)",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "command": {
-                            "type": "string",
-                            "description": "The command to send (e.g., 'ATZ', 'ATSP3', '0100')"
-                        },
-                        "delay": {
-                            "type": "number",
-                            "description": "Optional delay in seconds after sending (default 0.1)",
-                            "default": 0.1
-                        }
-                    },
-                    "required": ["command"]
-                }
-            },
-            {
-                "name": "get_connection_status",
-                "description": "Check if currently connected to ELM327 adapter and get connection details",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {}
-                }
-            },
-            {
-                "name": "get_protocol_info",
-                "description": "Get current protocol information from ELM327",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {}
-                }
-            },
-            {
-                "name": "report_finding",
-                "description": "Report a diagnostic finding or recommendation to the user",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "severity": {
-                            "type": "string",
-                            "enum": ["info", "success", "warning", "error"],
-                            "description": "Severity level of the finding"
-                        },
-                        "message": {
-                            "type": "string",
-                            "description": "The finding or recommendation message"
-                        }
-                    },
-                    "required": ["severity", "message"]
-                }
-            }
-        ]
+        # Tool name -> handler taking (tool_input, timestamp)
+        self._tool_handlers: Dict[str, Callable[[Dict[str, Any], str], Dict[str, Any]]] = {
+            "send_command": self._tool_send_command,
+            "get_connection_status": self._tool_get_connection_status,
+            "get_protocol_info": self._tool_get_protocol_info,
+            "report_finding": self._tool_report_finding,
+        }
+
+        # Tool schemas are shared, not rebuilt per instance
+        self.tools = self.TOOLS
+
+    def set_api_key(self, api_key: Optional[str]):
+        """
+        Set the API key used by this agent.
+
+        Args:
+            api_key: Anthropic API key (None to use basic diagnostics only)
+        """
+        self.api_key = api_key
+
+    def _log(self, entry: Dict):
+        """
+        Append an entry to the diagnostic log, counting entries that fall off.
+
+        Args:
+            entry: Log entry
+        """
+        if len(self.diagnostic_log) == self.diagnostic_log.maxlen:
+            self._dropped += 1
+        self.diagnostic_log.append(entry)
+
+    @property
+    def dropped_entries(self) -> int:
+        """Number of oldest log entries discarded to stay within LOG_CAP."""
+        return self._dropped
 
     def execute_tool(self, tool_name: str, tool_input: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -96,93 +152,109 @@ class AIDiagnosticAgent:
         Returns:
             Tool execution result
         """
-        timestamp = datetime.now().strftime("%H:%M:%S")
-
-        if tool_name == "send_command":
-            command = tool_input["command"]
-            delay = tool_input.get("delay", 0.1)
-
-            # Log the action
-            self.diagnostic_log.append({
-                "timestamp": timestamp,
-                "type": "command",
-                "command": command,
-                "delay": delay
-            })
-
-            # Execute
-            if not self.app.connected or not self.app.connection:
-                result = {"success": False, "error": "Not connected to ELM327 adapter"}
-            else:
-                try:
-                    response = self.app.connection.send_command(command, delay=delay)
-                    result = {"success": True, "response": response}
-
-                    # Log response
-                    self.diagnostic_log.append({
-                        "timestamp": timestamp,
-                        "type": "response",
-                        "response": response
-                    })
-                except Exception as e:
-                    result = {"success": False, "error": str(e)}
-
-            return result
-
-        elif tool_name == "get_connection_status":
-            status = {
-                "connected": self.app.connected,
-                "port": self.app.current_port,
-                "voltage": self.app.elm327.voltage if self.app.elm327 else None,
-                "protocol": self.app.elm327.protocol if self.app.elm327 else None
-            }
-
-            self.diagnostic_log.append({
-                "timestamp": timestamp,
-                "type": "status_check",
-                "status": status
-            })
-
-            return status
-
-        elif tool_name == "get_protocol_info":
-            if not self.app.connected or not self.app.connection:
-                return {"error": "Not connected"}
-
-            try:
-                protocol = self.app.connection.send_command("ATDP")
-                protocol_num = self.app.connection.send_command("ATDPN")
-
-                result = {
-                    "protocol": protocol,
-                    "protocol_number": protocol_num
-                }
-
-                self.diagnostic_log.append({
-                    "timestamp": timestamp,
-                    "type": "protocol_check",
-                    "result": result
-                })
-
-                return result
-            except Exception as e:
-                return {"error": str(e)}
-
-        elif tool_name == "report_finding":
-            severity = tool_input["severity"]
-            message = tool_input["message"]
+        handler = self._tool_handlers.get(tool_name)
+        if handler is None:
+            return {"error": f"Unknown tool: {tool_name}"}
 
-            self.diagnostic_log.append({
-                "timestamp": timestamp,
-                "type": "finding",
-                "severity": severity,
-                "message": message
-            })
+        return handler(tool_input, format_local_time())
 
-            return {"reported": True}
+    def _live_connection(self):
+        """
+        Get the adapter connection if the app is connected.
 
-        else:
-            return {"error": f"Unknown tool: {tool_name}"}
+        The GUI thread may swap the connection out, so handlers take this
+        reference once and use it for both the check and the commands.
+        """
+        app = self.app
+        return app.connection if app.connected else None
+
+    def _tool_send_command(self, tool_input: Dict[str, Any], timestamp: str) -> Dict[str, Any]:
+        """Handle the send_command tool."""
+        command = tool_input["command"]
+        delay = tool_input.get("delay", 0.1)
+        log = self._log
+
+        # Log the action
+        log({
+            "timestamp": timestamp,
+            "type": "command",
+            "command": command,
+            "delay": delay
+        })
+
+        # Execute
+        connection = self._live_connection()
+        if not connection:
+            return {"success": False, "error": "Not connected to ELM327 adapter"}
+
+        try:
+            response = connection.send_command(command, delay=delay)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+        # Log response
+        log({
+            "timestamp": timestamp,
+            "type": "response",
+            "response": response
+        })
+
+        return {"success": True, "response": response}
+
+    def _tool_get_connection_status(self, tool_input: Dict[str, Any], timestamp: str) -> Dict[str, Any]:
+        """Handle the get_connection_status tool."""
+        app = self.app
+        elm327 = app.elm327
+        status = {
+            "connected": app.connected,
+            "port": app.current_port,
+            "voltage": elm327.voltage if elm327 else None,
+            "protocol": elm327.protocol if elm327 else None
+        }
+
+        self._log({
+            "timestamp": timestamp,
+            "type": "status_check",
+            "status": status
+        })
+
+        return status
+
+    def _tool_get_protocol_info(self, tool_input: Dict[str, Any], timestamp: str) -> Dict[str, Any]:
+        """Handle the get_protocol_info tool."""
+        connection = self._live_connection()
+        if not connection:
+            return {"error": "Not connected"}
+
+        try:
+            protocol = connection.send_command("ATDP")
+            protocol_num = connection.send_command("ATDPN")
+        except Exception as e:
+            return {"error": str(e)}
+
+        result = {
+            "protocol": protocol,
+            "protocol_number": protocol_num
+        }
+
+        self._log({
+            "timestamp": timestamp,
+            "type": "protocol_check",
+            "result": result
+        })
+
+        return result
+
+    def _tool_report_finding(self, tool_input: Dict[str, Any], timestamp: str) -> Dict[str, Any]:
+        """Handle the report_finding tool."""
+        self._log({
+            "timestamp": timestamp,
+            "type": "finding",
+            "severity": tool_input["severity"],
+            "message": tool_input["message"]
+        })
+
+        return {"reported": True}
 
     def get_system_prompt(self, task: str) -> str:
         """
@@ -250,14 +322,15 @@ Begin your diagnostic work now."""
             Diagnostic log
         """
         self.running = True
-        self.diagnostic_log = []
+        self.diagnostic_log.clear()
+        self._dropped = 0
 
         # This is a simplified version - in production, integrate with Anthropic API
         # For now, return a mock diagnostic sequence
         self._mock_diagnostic_session(task, callback)
 
         self.running = False
-        return self.diagnostic_log
+        return list(self.diagnostic_log)
 
     def _mock_diagnostic_session(self, task: str, callback: Optional[Callable] = None):
         """
@@ -267,19 +340,11 @@ Begin your diagnostic work now."""
             task: Diagnostic task
             callback: Progress callback
         """
-        # Example diagnostic sequence
-        steps = [
-            ("Checking connection status...", "get_connection_status", {}),
-            ("Getting adapter version...", "send_command", {"command": "ATI"}),
-            ("Reading voltage...", "send_command", {"command": "ATRV"}),
-            ("Checking current protocol...", "send_command", {"command": "ATDP"}),
-            ("Setting protocol to ISO 9141-2...", "send_command", {"command": "ATSP3"}),
-            ("Increasing timeout for K-line...", "send_command", {"command": "ATST FF"}),
-            ("Enabling headers...", "send_command", {"command": "ATH1"}),
-            ("Testing with supported PIDs query...", "send_command", {"command": "0100"}),
-        ]
+        for description, tool, params in self._MOCK_STEPS:
+            # Stop early if the session was cancelled
+            if not self.running:
+                break
 
-        for description, tool, params in steps:
             if callback:
                 callback("progress", description)
 
@@ -302,26 +367,35 @@ Begin your diagnostic work now."""
         if not self.diagnostic_log:
             return "No diagnostic data available."
 
-        summary = "=== DIAGNOSTIC SUMMARY ===\n\n"
-
-        # Count commands and responses
-        commands = [log for log in self.diagnostic_log if log["type"] == "command"]
-        responses = [log for log in self.diagnostic_log if log["type"] == "response"]
-        findings = [log for log in self.diagnostic_log if log["type"] == "finding"]
-
-        summary += f"Commands sent: {len(commands)}\n"
-        summary += f"Responses received: {len(responses)}\n"
-        summary += f"Findings: {len(findings)}\n\n"
+        # Count commands and responses and collect findings in one pass
+        num_commands = num_responses = 0
+        findings = []
+        for entry in self.diagnostic_log:
+            entry_type = entry["type"]
+            if entry_type == "command":
+                num_commands += 1
+            elif entry_type == "response":
+                num_responses += 1
+            elif entry_type == "finding":
+                findings.append(entry)
+
+        parts = [
+            "=== DIAGNOSTIC SUMMARY ===\n\n",
+            f"Commands sent: {num_commands}\n",
+            f"Responses received: {num_responses}\n",
+            f"Findings: {len(findings)}\n",
+        ]
+        if self._dropped:
+            parts.append(f"Oldest log entries dropped: {self._dropped}\n")
+        parts.append("\n")
 
         # List findings
         if findings:
-            summary += "=== FINDINGS ===\n"
-            for finding in findings:
-                severity = finding["severity"].upper()
-                message = finding["message"]
-                summary += f"[{severity}] {message}\n"
+            parts.append("=== FINDINGS ===\n")
+            parts.extend(f"[{finding['severity'].upper()}] {finding['message']}\n"
+                         for finding in findings)
 
-        return summary
+        return ''.join(parts)
 
     def export_log(self, filename: str):
         """
@@ -330,5 +404,14 @@ Begin your diagnostic work now."""
         Args:
             filename: Output filename
         """
-        with open(filename, 'w') as f:
-            json.dump(self.diagnostic_log, f, indent=2)
+        # Snapshot the list so a running session can keep appending meanwhile
+        entries = list(self.diagnostic_log)
+
+        # Encode entry by entry into a large write buffer so only one entry's
+        # serialized form is held at a time
+        with open(filename, 'wb', buffering=EXPORT_BUFFER_SIZE) as f:
+            f.write(b'[')
+            for i, entry in enumerate(entries):
+                f.write(b',\n' if i else b'\n')
+                f.write(json_dumps(entry))
+            f.write(b'\n]\n' if entries else b']\n')
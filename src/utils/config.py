@@ -2,9 +2,10 @@
 Application configuration management.
 """
 
-import json
+import copy
 from typing import Any, Dict
 from pathlib import Path
+from utils.helpers import json_dumps, json_loads
 
 
 class Config:
@@ -46,7 +47,12 @@ class Config:
             config_file = 'config/app_config.json'
 
         self.config_file = Path(config_file)
-        self.config = self.DEFAULT_CONFIG.copy()
+        # Deep copy so merging a loaded file never alters the class defaults
+        self.config = copy.deepcopy(self.DEFAULT_CONFIG)
+
+        # Every dotted key path (sections included) mapped to its value, so
+        # get() is a single lookup
+        self._flat: Dict[str, Any] = {}
 
         # Load from file if exists
         self.load()
@@ -55,21 +61,23 @@ class Config:
         """Load configuration from file."""
         if self.config_file.exists():
             try:
-                with open(self.config_file, 'r') as f:
-                    loaded_config = json.load(f)
+                with open(self.config_file, 'rb') as f:
+                    loaded_config = json_loads(f.read())
                     # Merge with defaults
                     self._merge_config(self.config, loaded_config)
             except Exception as e:
                 print(f"Error loading config: {str(e)}")
 
+        self._rebuild_flat()
+
     def save(self):
         """Save configuration to file."""
         # Ensure directory exists
         self.config_file.parent.mkdir(parents=True, exist_ok=True)
 
         try:
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=2)
+            with open(self.config_file, 'wb') as f:
+                f.write(json_dumps(self.config))
         except Exception as e:
             print(f"Error saving config: {str(e)}")
 
@@ -84,16 +92,7 @@ class Config:
         Returns:
             Configuration value.
         """
-        keys = key.split('.')
-        value = self.config
-
-        for k in keys:
-            if isinstance(value, dict) and k in value:
-                value = value[k]
-            else:
-                return default
-
-        return value
+        return self._flat.get(key, default)
 
     def set(self, key: str, value: Any):
         """
@@ -115,6 +114,27 @@ class Config:
         # Set value
         config[keys[-1]] = value
 
+        # Replacing an existing plain value only touches its own entry;
+        # anything that adds or removes key paths needs the full rebuild
+        if (key in self._flat and not isinstance(value, dict)
+                and not isinstance(self._flat[key], dict)):
+            self._flat[key] = value
+        else:
+            self._rebuild_flat()
+
+    def _rebuild_flat(self):
+        """Rebuild the dotted-key lookup from the nested configuration."""
+        flat = {}
+        stack = [('', self.config)]
+        while stack:
+            prefix, section = stack.pop()
+            for k, v in section.items():
+                path = prefix + k
+                flat[path] = v
+                if isinstance(v, dict):
+                    stack.append((path + '.', v))
+        self._flat = flat
+
     def _merge_config(self, base: Dict, overlay: Dict):
         """
         Recursively merge overlay config into base.
@@ -2,7 +2,76 @@
 Utility helper functions.
 """
 
-from typing import List
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Prefer orjson (optional dependency) for faster JSON parsing and encoding
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    import json
+
+
+# Two-digit uppercase hex for every byte value
+_BYTE_HEX = tuple(f'{b:02X}' for b in range(256))
+
+# strftime format -> (second, formatted text) of the last format_local_time call
+_LOCAL_TIME_CACHE: Dict[str, Tuple[int, str]] = {}
+
+
+def json_loads(data: bytes) -> Any:
+    """
+    Parse JSON text.
+
+    Args:
+        data: JSON document as bytes or str
+
+    Returns:
+        Parsed object.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj: Any) -> bytes:
+    """
+    Encode an object as indented JSON.
+
+    Args:
+        obj: Object to encode
+
+    Returns:
+        UTF-8 encoded JSON with 2-space indentation.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode('utf-8')
+
+
+def format_local_time(fmt: str = "%H:%M:%S", sec: Optional[int] = None) -> str:
+    """
+    Format a whole second of local time.
+
+    Callers that stamp many lines per second get the cached text back;
+    strftime only runs when the second changes.
+
+    Args:
+        fmt: strftime format (default HH:MM:SS)
+        sec: Seconds since the epoch (default now)
+
+    Returns:
+        Formatted local time.
+    """
+    if sec is None:
+        sec = int(time.time())
+    cached = _LOCAL_TIME_CACHE.get(fmt)
+    if cached is not None and cached[0] == sec:
+        return cached[1]
+    text = time.strftime(fmt, time.localtime(sec))
+    _LOCAL_TIME_CACHE[fmt] = (sec, text)
+    return text
 
 
 def format_hex(value: int, width: int = 2) -> str:
@@ -30,7 +99,11 @@ def bytes_to_hex_string(data: List[int], separator: str = ' ') -> str:
     Returns:
         Hex string (e.g., '01 0C 1A F8')
     """
-    return separator.join([f'{b:02X}' for b in data])
+    if not separator:
+        return bytes(data).hex().upper()
+    if len(separator) == 1:
+        return bytes(data).hex(separator).upper()
+    return separator.join([_BYTE_HEX[b] for b in data])
 
 
 def hex_string_to_bytes(hex_str: str) -> List[int]:
@@ -46,14 +119,8 @@ def hex_string_to_bytes(hex_str: str) -> List[int]:
     # Remove spaces and common prefixes
     hex_str = hex_str.replace(' ', '').replace('0x', '').upper()
 
-    # Parse pairs of hex digits
-    bytes_list = []
-    for i in range(0, len(hex_str), 2):
-        if i + 1 < len(hex_str):
-            byte_val = int(hex_str[i:i+2], 16)
-            bytes_list.append(byte_val)
-
-    return bytes_list
+    # Parse pairs of hex digits; a trailing odd digit is ignored
+    return list(bytes.fromhex(hex_str[:len(hex_str) & ~1]))
 
 
 def clamp(value: float, min_val: float, max_val: float) -> float:
@@ -68,7 +135,31 @@ def clamp(value: float, min_val: float, max_val: float) -> float:
     Returns:
         Clamped value
     """
-    return max(min_val, min(max_val, value))
+    # Plain comparisons instead of nested min()/max() calls
+    if value < min_val:
+        return min_val
+    if value > max_val:
+        return max_val
+    return value
+
+
+def clamp_array(values, min_val: float, max_val: float) -> 'numpy.ndarray':
+    """
+    Clamp every element of an array of samples between min and max.
+
+    Requires NumPy (optional dependency).
+
+    Args:
+        values: Array-like of values to clamp
+        min_val: Minimum value
+        max_val: Maximum value
+
+    Returns:
+        NumPy array of clamped values
+    """
+    import numpy as np
+
+    return np.clip(values, min_val, max_val)
 
 
 def format_value(value: any, decimals: int = 2) -> str:
@@ -84,7 +175,4 @@ def format_value(value: any, decimals: int = 2) -> str:
     """
     if isinstance(value, float):
         return f'{value:.{decimals}f}'
-    elif isinstance(value, int):
-        return str(value)
-    else:
-        return str(value)
+    return str(value)